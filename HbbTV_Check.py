@@ -1,40 +1,92 @@
 import argparse
+import bisect
+import functools
+import mmap
 import os
 import re
-from typing import Dict, List, Tuple, Optional
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Set, Tuple, Optional
 
 from openpyxl import Workbook, load_workbook
 from openpyxl.styles import Alignment, Font, PatternFill
 
-# Import sheet naming rule from the reference checker
-try:
-    import importlib.util, sys
-    ref_path = os.path.join(os.path.dirname(__file__), "check_dvbs_satellite_flag.py")
-    spec = importlib.util.spec_from_file_location("ref_checker", ref_path)
-    ref_checker = importlib.util.module_from_spec(spec)
-    sys.modules["ref_checker"] = ref_checker
-    spec.loader.exec_module(ref_checker)  # type: ignore
-    _sheet_name_for_model = ref_checker._sheet_name_for_model  # type: ignore
-except Exception:
-    # Fallback if import fails
-    def _sheet_name_for_model(model_ini_path: str) -> str:
-        base = os.path.basename(model_ini_path or "")
-        m = re.match(r"^(\d+)_", base)
-        if m:
-            return f"PID_{int(m.group(1))}"
-        return "others"
+# Sheet naming rule, same as the reference checker (check_dvbs_satellite_flag.py)
+_PID_RE = re.compile(r"^(\d+)_")
+
+
+@functools.lru_cache(maxsize=1024)
+def _sheet_name_for_model(model_ini_path: str) -> str:
+    base = os.path.basename(model_ini_path or "")
+    m = _PID_RE.match(base)
+    if m:
+        return f"PID_{int(m.group(1))}"
+    return "others"
+
+
+# Everything inside a <COUNTRY_TVCONFIG_MAP> block is picked up by one alternation walked
+# linearly over the (memory-mapped) XML bytes; element bodies may not run past a block boundary.
+_IN_BLOCK = rb"(?:(?!<\s*/?\s*COUNTRY_TVCONFIG_MAP\s*>).)*?"
+_SCAN_RE = re.compile(
+    rb"(?P<open><\s*COUNTRY_TVCONFIG_MAP\s*>)"
+    rb"|(?P<close><\s*/\s*COUNTRY_TVCONFIG_MAP\s*>)"
+    rb"|<\s*TV_SYSTEM\s*>(?P<tv_system>" + _IN_BLOCK + rb")<\s*/\s*TV_SYSTEM\s*>"
+    rb"|<\s*COUNTRY_NAME\s*>(?P<country_name>" + _IN_BLOCK + rb")<\s*/\s*COUNTRY_NAME\s*>"
+    rb"|<\s*TV_CONFIG\s*>(?P<tv_config>" + _IN_BLOCK + rb")<\s*/\s*TV_CONFIG\s*>"
+    rb"|(?P<tv_config_tag><\s*TV_CONFIG\b)",
+    re.IGNORECASE | re.DOTALL,
+)
+_NON_SPACE_RE = re.compile(rb"\S")
+
+
+COMMON_ALIGN = Alignment(wrap_text=True, vertical="top")
+BOLD = Font(bold=True)
+REPORT_HEADERS = ["Model.ini", "XML", "DVB 區塊數", "錯誤的line number", "失敗數", "失敗項彙總", "Notes"]
+# Column widths (approximate to reference script's style); wider for Model/XML and Summary
+REPORT_WIDTHS = (40, 60, 12, 20, 10, 80, 60)
 
 
 def _read_text(path: str) -> str:
-    for enc in ("utf-8", "latin-1", "utf-16"):
+    """Read the file once as bytes, then decode by BOM sniff (UTF-8/UTF-16), UTF-8, or latin-1."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return ""
+    if data[:3] == b"\xef\xbb\xbf":
+        return data[3:].decode("utf-8", errors="replace")
+    if data[:2] in (b"\xff\xfe", b"\xfe\xff"):
+        return data.decode("utf-16", errors="replace")
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode("latin-1")
+
+
+def _decode(data: bytes) -> str:
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode("latin-1")
+
+
+@contextmanager
+def _xml_buffer(path: str) -> Iterator[bytes]:
+    """
+    Yield the XML as a read-only mmap so regexes run on the OS page cache without
+    materializing a str copy. UTF-16 files are decoded and re-encoded as UTF-8 bytes.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
         try:
-            with open(path, "r", encoding=enc) as f:
-                return f.read()
-        except UnicodeDecodeError:
-            continue
-        except FileNotFoundError:
-            return ""
-    return ""
+            if mm[:2] in (b"\xff\xfe", b"\xfe\xff"):
+                yield _read_text(path).encode("utf-8")
+            else:
+                yield mm
+        finally:
+            mm.close()
 
 
 def _resolve_tvconfigs_path(root: str, tvconfigs_like: str) -> str:
@@ -49,26 +101,49 @@ def _resolve_tvconfigs_path(root: str, tvconfigs_like: str) -> str:
     return os.path.normpath(os.path.join(root, tvconfigs_like))
 
 
-def _find_blocks_with_spans(xml_text: str) -> List[Tuple[Tuple[int, int], str]]:
+def _iter_blocks(xml_buf: bytes) -> Iterator[Dict]:
     """
-    Return list of ((start, end), block_text) for each <COUNTRY_TVCONFIG_MAP>...</COUNTRY_TVCONFIG_MAP> block.
-    Case-insensitive, DOTALL.
+    Yield one dict per <COUNTRY_TVCONFIG_MAP>...</COUNTRY_TVCONFIG_MAP> block in a single pass:
+      start, COUNTRY_NAME, TV_SYSTEM, TV_CONFIG (first occurrence, stripped) and tv_config_pos
+      (byte index of the first <TV_CONFIG tag, or None). Case-insensitive, DOTALL.
     """
-    blocks = []
-    pattern = re.compile(r"<\s*COUNTRY_TVCONFIG_MAP\s*>.*?<\s*/\s*COUNTRY_TVCONFIG_MAP\s*>", re.IGNORECASE | re.DOTALL)
-    for m in pattern.finditer(xml_text):
-        blocks.append(((m.start(), m.end()), m.group(0)))
-    return blocks
-
-
-def _extract_tag(txt: str, tag: str) -> str:
-    m = re.search(rf"<\s*{tag}\s*>(.*?)<\s*/\s*{tag}\s*>", txt, re.IGNORECASE | re.DOTALL)
-    return (m.group(1).strip() if m else "")
-
-
-def _line_number_at(text: str, index: int) -> int:
-    """1-based line number for a given byte index in text."""
-    return text.count("\n", 0, index) + 1
+    cur: Optional[Dict] = None
+    for m in _SCAN_RE.finditer(xml_buf):
+        kind = m.lastgroup
+        if kind == "open":
+            if cur is None:
+                cur = {"start": m.start(), "COUNTRY_NAME": None, "TV_SYSTEM": None,
+                       "TV_CONFIG": None, "tv_config_pos": None}
+            continue
+        if cur is None:
+            continue
+        if kind == "close":
+            yield cur
+            cur = None
+        elif kind == "tv_config_tag":
+            if cur["tv_config_pos"] is None:
+                cur["tv_config_pos"] = m.start()
+        else:
+            if kind == "tv_config" and cur["tv_config_pos"] is None:
+                cur["tv_config_pos"] = m.start()
+            key = kind.upper()
+            if cur[key] is None:
+                cur[key] = _decode(m.group(kind)).strip()
+
+
+def _newline_offsets(buf: bytes) -> List[int]:
+    """Sorted byte offsets of every newline in buf (built once per file)."""
+    offsets = []
+    pos = buf.find(b"\n")
+    while pos != -1:
+        offsets.append(pos)
+        pos = buf.find(b"\n", pos + 1)
+    return offsets
+
+
+def _line_number_at(nl_offsets: List[int], index: int) -> int:
+    """1-based line number for a given index, looked up in precomputed newline offsets."""
+    return bisect.bisect_right(nl_offsets, index) + 1
 
 
 def check_country_tvconfig(xml_path: str, treat_dvb_prefix_as_dvb: bool = True, verbose: bool = False) -> Dict:
@@ -90,40 +165,45 @@ def check_country_tvconfig(xml_path: str, treat_dvb_prefix_as_dvb: bool = True,
             "notes": "; ".join(notes) if notes else "",
         }
 
-    xml_text = _read_text(xml_path)
-    if not xml_text.strip():
-        notes.append("XML is empty or cannot be read")
-        return {
-            "xml_path": xml_path,
-            "dvb_blocks": 0,
-            "failed": [],
-            "failed_count": 0,
-            "error_lines": [],
-            "notes": "; ".join(notes) if notes else "",
-        }
+    with _xml_buffer(xml_path) as xml_buf:
+        if not _NON_SPACE_RE.search(xml_buf):
+            notes.append("XML is empty or cannot be read")
+            return {
+                "xml_path": xml_path,
+                "dvb_blocks": 0,
+                "failed": [],
+                "failed_count": 0,
+                "error_lines": [],
+                "notes": "; ".join(notes) if notes else "",
+            }
+
+        blocks = 0
+        dvb_blocks = 0
+        failed: List[Tuple[str, str, str, int]] = []  # (country, tv_system, tv_config, line_no)
+        err_lines: Set[int] = set()
+        nl_offsets: Optional[List[int]] = None
+        for blk in _iter_blocks(xml_buf):
+            blocks += 1
+            tv_system = (blk["TV_SYSTEM"] or "").upper()
+            is_dvb = (tv_system == "DVB") or (treat_dvb_prefix_as_dvb and tv_system.startswith("DVB_"))
+            if not is_dvb:
+                continue
+            dvb_blocks += 1
+
+            tv_config_val = blk["TV_CONFIG"] or ""
+            if "tv.config.dvb_hbbtv" not in tv_config_val:
+                # Absolute line number of the <TV_CONFIG> open tag (or the block itself) within the full file
+                if nl_offsets is None:
+                    nl_offsets = _newline_offsets(xml_buf)
+                pos = blk["tv_config_pos"]
+                line_no = _line_number_at(nl_offsets, blk["start"] if pos is None else pos)
+                failed.append((blk["COUNTRY_NAME"] or "", tv_system, tv_config_val, line_no))
+                err_lines.add(line_no)
 
-    blocks = _find_blocks_with_spans(xml_text)
     if verbose:
-        print(f"[INFO] Parsed COUNTRY_TVCONFIG_MAP blocks: {len(blocks)}")
-
-    dvb_blocks = 0
-    failed: List[Tuple[str, str, str, int]] = []  # (country, tv_system, tv_config, line_no)
-    for (start, end), frag in blocks:
-        tv_system = _extract_tag(frag, "TV_SYSTEM").upper()
-        is_dvb = (tv_system == "DVB") or (treat_dvb_prefix_as_dvb and tv_system.startswith("DVB_"))
-        if not is_dvb:
-            continue
-        dvb_blocks += 1
-
-        tv_config_match = re.search(r"<\s*TV_CONFIG\s*>(.*?)<\s*/\s*TV_CONFIG\s*>", frag, re.IGNORECASE | re.DOTALL)
-        tv_config_val = tv_config_match.group(1).strip() if tv_config_match else ""
-        if "tv.config.dvb_hbbtv" not in tv_config_val:
-            # Compute the absolute line number of <TV_CONFIG> open tag within the full file text
-            tag_match = re.search(r"<\s*TV_CONFIG\b", frag, re.IGNORECASE)
-            line_no = _line_number_at(xml_text, start + (tag_match.start() if tag_match else 0))
-            failed.append((_extract_tag(frag, "COUNTRY_NAME") or "", tv_system, tv_config_val, line_no))
+        print(f"[INFO] Parsed COUNTRY_TVCONFIG_MAP blocks: {blocks}")
 
-    error_lines = sorted({ln for *_, ln in failed})
+    error_lines = sorted(err_lines)
     return {
         "xml_path": xml_path,
         "dvb_blocks": dvb_blocks,
@@ -134,7 +214,58 @@ def check_country_tvconfig(xml_path: str, treat_dvb_prefix_as_dvb: bool = True,
     }
 
 
-def export_report(res: Dict, model_ini: Optional[str], xlsx_path: str) -> None:
+def _report_row(res: Dict, model_ini: Optional[str]) -> List:
+    """Build the report row (columns A..G, see export_report) for one check result."""
+    model_col = model_ini or ""
+    xml_col = res.get("xml_path", "")
+    dvb_count_col = res.get("dvb_blocks", 0)
+    err_lines = res.get("error_lines", [])
+    err_lines_col = ", ".join(str(n) for n in err_lines) if err_lines else ""
+    fail_count_col = res.get("failed_count", 0)
+
+    # Build failure summary: Country(tv_system): tv_config
+    failed: List[Tuple[str, str, str, int]] = res.get("failed", [])
+    if failed:
+        parts = [f"{(country or '?') }({tv}): {tvconf or '(empty)'} [L{ln}]" for country, tv, tvconf, ln in failed]
+        fail_summary_col = "\n".join(parts)
+    else:
+        fail_summary_col = ""
+
+    notes_col = res.get("notes", "")
+
+    return [model_col, xml_col, dvb_count_col, err_lines_col, fail_count_col, fail_summary_col, notes_col]
+
+
+def open_report(xlsx_path: str) -> Workbook:
+    """Open an existing report workbook, or create a new one."""
+    try:
+        return load_workbook(xlsx_path)
+    except Exception:
+        return Workbook()
+
+
+def save_report(wb: Workbook, xlsx_path: str) -> None:
+    """Drop the default sheet (if other sheets exist) and save the workbook."""
+    if "Sheet" in wb.sheetnames and len(wb.sheetnames) > 1:
+        try:
+            wb.remove(wb["Sheet"])
+        except Exception:
+            pass
+    wb.save(xlsx_path)
+
+
+@contextmanager
+def report_session(xlsx_path: str) -> Iterator[Workbook]:
+    """
+    Keep one workbook open across several export_report() calls and save it once on exit,
+    instead of re-loading and re-writing the xlsx for every row.
+    """
+    wb = open_report(xlsx_path)
+    yield wb
+    save_report(wb, xlsx_path)
+
+
+def export_report(res: Dict, model_ini: Optional[str], xlsx_path: str, wb: Optional[Workbook] = None) -> None:
     """
     Write or append a row to an Excel sheet, following the style used by the reference checker:
       - Sheet name derives from model ini (PID_xxx or 'others').
@@ -147,66 +278,62 @@ def export_report(res: Dict, model_ini: Optional[str], xlsx_path: str) -> None:
       E: 失敗數
       F: 失敗項彙總
       G: Notes
+    When wb is given (see report_session), the row is added to it and saving is left to the caller.
     """
-    COMMON_ALIGN = Alignment(wrap_text=True, vertical="top")
-    BOLD = Font(bold=True)
-
     sheet_name = _sheet_name_for_model(model_ini or "")
 
     # Open workbook or create
-    try:
-        wb = load_workbook(xlsx_path)
-    except Exception:
-        wb = Workbook()
-
-    # Use or create sheet
-    ws = wb[sheet_name] if sheet_name in wb.sheetnames else wb.create_sheet(title=sheet_name)
+    standalone = wb is None
+    if standalone:
+        wb = open_report(xlsx_path)
 
-    # Header
-    headers = ["Model.ini", "XML", "DVB 區塊數", "錯誤的line number", "失敗數", "失敗項彙總", "Notes"]
-    if ws.max_row == 1 and all(c.value is None for c in ws[1]):
-        ws.append(headers)
+    # Use or create sheet; header, header style and column widths are set once, when the sheet is created
+    if sheet_name in wb.sheetnames:
+        ws = wb[sheet_name]
+    else:
+        ws = wb.create_sheet(title=sheet_name)
+        ws.append(REPORT_HEADERS)
         for cell in ws[1]:
             cell.font = BOLD
             cell.alignment = COMMON_ALIGN
+        for letter, w in zip("ABCDEFG", REPORT_WIDTHS):
+            ws.column_dimensions[letter].width = w
 
-    # Build row contents
-    model_col = model_ini or ""
-    xml_col = res.get("xml_path", "")
-    dvb_count_col = res.get("dvb_blocks", 0)
-    err_lines = res.get("error_lines", [])
-    err_lines_col = ", ".join(str(n) for n in err_lines) if err_lines else ""
-    fail_count_col = res.get("failed_count", 0)
-
-    # Build failure summary: Country(tv_system): tv_config
-    failed: List[Tuple[str, str, str, int]] = res.get("failed", [])
-    if failed:
-        parts = [f"{(country or '?') }({tv}): {tvconf or '(empty)'} [L{ln}]" for country, tv, tvconf, ln in failed]
-        fail_summary_col = "\n".join(parts)
-    else:
-        fail_summary_col = ""
-
-    notes_col = res.get("notes", "")
-
-    ws.append([model_col, xml_col, dvb_count_col, err_lines_col, fail_count_col, fail_summary_col, notes_col])
+    ws.append(_report_row(res, model_ini))
     last_row = ws.max_row
     for cell in ws[last_row]:
         cell.alignment = COMMON_ALIGN
 
-    # Column widths (approximate to reference script's style)
-    # Wider for Model/XML and Summary
-    widths = [40, 60, 12, 20, 10, 80, 60]
-    for idx, w in enumerate(widths, start=1):
-        ws.column_dimensions[chr(64 + idx)].width = w
+    if standalone:
+        save_report(wb, xlsx_path)
 
-    # Remove default sheet if present and more than one sheet exists
-    if "Sheet" in wb.sheetnames and len(wb.sheetnames) > 1:
-        try:
-            wb.remove(wb["Sheet"])
-        except Exception:
-            pass
 
-    wb.save(xlsx_path)
+def export_report_xlsxwriter(entries: List[Tuple[Dict, Optional[str]]], xlsx_path: str) -> None:
+    """
+    One-shot export of all (res, model_ini) rows with xlsxwriter, same layout as export_report.
+    xlsxwriter cannot append, so this always writes a new file.
+    """
+    try:
+        import xlsxwriter
+    except ImportError:
+        raise SystemExit("[ERROR] --excel-backend xlsxwriter requires xlsxwriter (pip install --user xlsxwriter)")
+
+    wb = xlsxwriter.Workbook(xlsx_path)
+    wrap = wb.add_format({"text_wrap": True, "valign": "top"})
+    bold = wb.add_format({"bold": True, "text_wrap": True, "valign": "top"})
+    sheets: Dict[str, List] = {}  # sheet name -> [worksheet, next row]
+    for res, model_ini in entries:
+        sheet_name = _sheet_name_for_model(model_ini or "")
+        if sheet_name not in sheets:
+            ws = wb.add_worksheet(sheet_name)
+            ws.write_row(0, 0, REPORT_HEADERS, bold)
+            for idx, w in enumerate(REPORT_WIDTHS):
+                ws.set_column(idx, idx, w)
+            sheets[sheet_name] = [ws, 1]
+        ws, row = sheets[sheet_name]
+        ws.write_row(row, 0, _report_row(res, model_ini), wrap)
+        sheets[sheet_name][1] = row + 1
+    wb.close()
 
 
 def main():
@@ -216,6 +343,9 @@ def main():
     parser.add_argument("--xml", default="/tvconfigs/TvSysMap/countryTvSysMap.xml",
                         help="XML path (abs or relative or starting with /tvconfigs/). Default: /tvconfigs/TvSysMap/countryTvSysMap.xml")
     parser.add_argument("--report-xlsx", default="kipling.xlsx", help="Output Excel path (append). Default: kipling.xlsx")
+    parser.add_argument("--excel-backend", choices=("openpyxl", "xlsxwriter"), default="openpyxl",
+                        help="Excel writer. xlsxwriter is faster but can only create a new file; "
+                             "an existing report is always appended with openpyxl. Default: openpyxl")
     parser.add_argument("-v", "--verbose", action="store_true", help="Verbose logging.")
     args = parser.parse_args()
 
@@ -237,7 +367,15 @@ def main():
     if res['notes']:
         print(f"Notes            : {res['notes']}")
 
-    export_report(res, args.model_ini, args.report_xlsx)
+    backend = args.excel_backend
+    if backend == "xlsxwriter" and os.path.exists(args.report_xlsx):
+        print(f"[WARN] xlsxwriter cannot append to {args.report_xlsx}; using openpyxl")
+        backend = "openpyxl"
+    if backend == "xlsxwriter":
+        export_report_xlsxwriter([(res, args.model_ini)], args.report_xlsx)
+    else:
+        with report_session(args.report_xlsx) as wb:
+            export_report(res, args.model_ini, args.report_xlsx, wb=wb)
     print(f"[INFO] Report appended to: {args.report_xlsx} (sheet: {_sheet_name_for_model(args.model_ini)})")
 
 
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+_tvconfigs_common.py
+
+check_* 腳本共用的小工具（原本在 check_AUTO_PCMODE.py / check_CI.py 各有一份）：
+- sheet 命名、/tvconfigs 路徑映射、INI 解析與單一 key 查找
+- 整份讀檔 / 解析結果依 (path, mtime_ns, size) 快取（單一讀法），多個 check 讀同一份 model.ini 時只讀、只解析一次
+- 純函式（_sheet_name_for_model / _resolve_tvconfigs_path）以 lru_cache 快取
+- map_models：多個 model.ini 以 process pool 平行檢查（各模組的 run_many）
+- default_settings_main：TvDefaultSettingsPath 類檢查（check_AUTO_PCMODE / check_CI）共用的 CLI 與批次報表流程
+
+不依賴 openpyxl；報表輸出在 _tvconfigs_report.py，只在實際輸出報表時才 import。
+"""
+import argparse
+import csv
+import glob
+import io
+import mmap
+import os
+import posixpath
+import re
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, redirect_stdout
+from functools import lru_cache, partial
+from itertools import repeat
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+
+# -----------------------------
+# Sheet 命名
+# -----------------------------
+
+@lru_cache(maxsize=4096)
+def _sheet_name_for_model(model_ini_path: str) -> str:
+    """
+    以 model.ini 檔名的數字前綴決定 sheet 名：'PID_<N>'；無數字則 'others'
+    例：'1_EU_xxx.ini' → 'PID_1'
+    """
+    prefix, sep, _ = os.path.basename(model_ini_path or "").partition("_")
+    if sep and prefix.isdecimal():
+        return f"PID_{int(prefix)}"
+    return "others"
+
+
+# -----------------------------
+# openpyxl
+# -----------------------------
+
+def _ensure_openpyxl():
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        raise SystemExit(
+            "[ERROR] 需要 openpyxl 以輸出/附加報表。\n"
+            "  安裝： pip install --user openpyxl\n"
+        )
+
+
+# -----------------------------
+# 報表欄位
+# -----------------------------
+
+def _na(s: Optional[str]) -> str:
+    s = (s or "").strip()
+    return s if s else "N/A"
+
+
+# -----------------------------
+# 報表 CSV sidecar（--defer-report）
+# -----------------------------
+
+def sidecar_path(xlsx_path: str, kind: str = "rows") -> str:
+    """<xlsx_path>.<kind>.csv；版面不同的報表（例如 check_VRR_QMS）用自己的 kind，finalize 時不會互相吃掉對方的列。"""
+    return f"{xlsx_path}.{kind}.csv"
+
+
+def append_sidecar_rows(rows: List[List[Any]], sheet_name: str, xlsx_path: str, highlight: bool = False,
+                        kind: str = "rows") -> None:
+    """
+    大量批次用：不開 xlsx，只把多列附加到 <xlsx_path>.<kind>.csv（前兩欄為分頁名、是否套 highlight 配色），
+    全部跑完再一次寫進 xlsx（_tvconfigs_report.finalize_report 等）。不需要 openpyxl。
+    rows 為空時只記一筆分頁名，finalize 時仍會建立該分頁（同直接輸出時會建分頁與表頭）。
+    """
+    flag = "1" if highlight else ""
+    with open(sidecar_path(xlsx_path, kind), "a", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        if not rows:
+            w.writerow([sheet_name, flag])
+        for row in rows:
+            w.writerow([sheet_name, flag] + list(row))
+
+
+def append_sidecar_row(row: List[Any], sheet_name: str, xlsx_path: str, highlight: bool = False) -> None:
+    """附加單列（見 append_sidecar_rows）。"""
+    append_sidecar_rows([row], sheet_name, xlsx_path, highlight)
+
+
+def read_sidecar_rows(xlsx_path: str, kind: str = "rows"
+                      ) -> Optional[Tuple[Dict[str, List[List[str]]], Dict[str, List[bool]]]]:
+    """
+    讀回 append_sidecar_rows 累積的 CSV → ({分頁: [列]}, {分頁: [每列是否套 highlight]})，分頁與列維持附加順序。
+    沒有 sidecar 檔回傳 None。
+    """
+    path = sidecar_path(xlsx_path, kind)
+    if not os.path.exists(path):
+        return None
+    rows_by_sheet: Dict[str, List[List[str]]] = {}
+    flags_by_sheet: Dict[str, List[bool]] = {}
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for record in csv.reader(f):
+            if len(record) < 2:
+                continue
+            sheet_name, flag = record[0], record[1]
+            rows = rows_by_sheet.setdefault(sheet_name, [])
+            flags = flags_by_sheet.setdefault(sheet_name, [])
+            if len(record) > 2:
+                rows.append(record[2:])
+                flags.append(flag == "1")
+    return rows_by_sheet, flags_by_sheet
+
+
+# -----------------------------
+# 多 model 平行處理
+# -----------------------------
+
+def read_batch_list(path: str) -> List[str]:
+    """--batch-list 檔案：一行一個 model.ini 路徑；空白行與 '#' 開頭的行略過。"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [s for s in (line.strip() for line in f) if s and not s.startswith("#")]
+
+
+def _call_capturing_stdout(fn: Callable, *args: Any) -> Tuple[Any, str]:
+    buf = io.StringIO()
+    with redirect_stdout(buf):
+        res = fn(*args)
+    return res, buf.getvalue()
+
+
+def map_models(fn: Callable, model_inis: Iterable[str], *args: Any,
+               max_workers: Optional[int] = None) -> List[Tuple[Any, str]]:
+    """
+    對每個 model.ini 呼叫 fn(model_ini, *args)，以 ProcessPoolExecutor 平行執行（fn 須為模組層級函式）。
+    回傳依輸入順序的 [(結果, 該次 stdout)]，由呼叫端依序印出，多個 worker 的輸出不會交錯。
+    只有一個 model 或 max_workers == 1 時直接在本行程執行。
+    """
+    model_inis = list(model_inis)
+    if max_workers == 1 or len(model_inis) <= 1:
+        return [_call_capturing_stdout(fn, m, *args) for m in model_inis]
+    workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(model_inis) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        return list(ex.map(partial(_call_capturing_stdout, fn), model_inis, *(repeat(a) for a in args),
+                           chunksize=chunksize))
+
+
+# -----------------------------
+# INI 讀取
+# -----------------------------
+
+# 逐行掃描設定檔時的讀取緩衝（預設 8KB 對數百 KB 的 settings 檔 syscall 太多）
+READ_BUFFERING = 262144
+
+
+@contextmanager
+def mapped_file(path: str) -> Iterator[Union[mmap.mmap, bytes]]:
+    """唯讀 mmap 整個檔案（bytes-like，可直接給 bytes regex / find 使用，不複製進 Python）；空檔回傳 b""。"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+
+def _strip_comment(line: str) -> str:
+    # 支援 '#' 或 ';' 註解；多數行沒有註解，先用 in 判斷再切
+    if "#" in line or ";" in line:
+        return line.partition("#")[0].partition(";")[0].strip()
+    return line.strip()
+
+
+@lru_cache(maxsize=4096)
+def _resolve_tvconfigs_path(root: str, tvconfigs_like: str) -> str:
+    """
+    /tvconfigs/... → <root>/...
+    ./ 或 ../ 相對路徑 → 以 root 為基底
+    其他絕對路徑（非 /tvconfigs）維持原樣
+    其他純相對路徑 → root/相對
+    （tvconfigs 路徑一律是 POSIX 格式，直接字串相接 + posixpath.normpath）
+    """
+    if tvconfigs_like.startswith("/tvconfigs/"):
+        rel = tvconfigs_like[11:]  # len("/tvconfigs/")
+    elif tvconfigs_like.startswith("/"):
+        return tvconfigs_like
+    else:
+        rel = tvconfigs_like
+    if rel.startswith("/"):  # '/tvconfigs//x' → 同 os.path.join 行為，視為絕對路徑
+        return posixpath.normpath(rel)
+    base = root if not root or root.endswith("/") else root + "/"
+    return posixpath.normpath(base + rel)
+
+
+# 一行一組 key = value：key 到第一個 '='（其前不可有註解），值允許前後引號、中間不可再有引號，
+# '#' / ';' 之後為註解；值結尾若是空白則必須緊接引號（同原本先 strip 整行再比對的行為）。
+# 整份文字用一個 MULTILINE regex 掃過，不逐行 strip_comment + match
+_INI_PAIR_RE = re.compile(
+    r'(?m)^([^\n#;=]*)=[^\S\n]*"?([^"\n#;]*[^"\s#;]|[^"\n#;]+(?="))"?[^\S\n]*(?=[#;\n]|\Z)'
+)
+
+# str.splitlines 也視為換行、但 regex 的 ^ 不認得的字元；出現時先轉成 '\n'，切行結果與 splitlines 相同
+_OTHER_LINE_BREAKS = "\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+_TO_NEWLINE = str.maketrans(dict.fromkeys(_OTHER_LINE_BREAKS, "\n"))
+
+
+def _normalize_line_breaks(text: str) -> str:
+    """
+    _OTHER_LINE_BREAKS → '\n'；沒有這些字元時原字串直接回傳。
+    逐字元 `in` 檢查（單一字元搜尋走 memchr）比字元類別 regex 掃描快約百倍，也省下 translate 的整份複製。
+    """
+    if any(c in text for c in _OTHER_LINE_BREAKS):
+        return text.translate(_TO_NEWLINE)
+    return text
+
+
+def _parse_ini_text(text: str) -> Dict[str, str]:
+    """
+    INI 文字 → {小寫 key: value}（忽略註解與空白、允許引號），同一 key 以第一筆有效值為準。
+    """
+    text = _normalize_line_breaks(text)
+    pairs: Dict[str, str] = {}
+    for k, v in _INI_PAIR_RE.findall(text):
+        pairs.setdefault(k.strip().lower(), v.strip())
+    return pairs
+
+
+@lru_cache(maxsize=128)
+def _read_text_cached(path: str, mtime_ns: int, size: int) -> str:
+    """
+    寬鬆讀取整份檔案（utf-8 → latin-1），依 (path, mtime_ns, size) 快取；
+    檔案修改後 mtime 或大小改變即重新讀取（mtime 解析度粗的檔案系統上 size 多一層保險）。
+    只開檔、讀取一次，各編碼在同一份 bytes 上嘗試（latin-1 可解任何位元組，原本其後的 utf-16 重試不會執行到）；
+    換行同文字模式開檔（universal newlines）：\r\n、\r → \n。
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        text = data.decode("latin-1")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def _read_text(path: str) -> str:
+    """同 _read_text_cached；檔案不存在時丟 FileNotFoundError。"""
+    st = os.stat(path)
+    return _read_text_cached(path, st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=64)
+def _parse_ini_cached(path: str, mtime_ns: int, size: int) -> Dict[str, str]:
+    return _parse_ini_text(_read_text_cached(path, mtime_ns, size))
+
+
+def _parse_ini(path: str) -> Dict[str, str]:
+    """
+    以 _read_text 的讀法解析整份 INI → {小寫 key: value}（規則同 _parse_ini_text），依 (path, mtime_ns, size) 快取。
+    """
+    st = os.stat(path)
+    return _parse_ini_cached(path, st.st_mtime_ns, st.st_size)
+
+
+def _find_key_value_in_file(path: str, key: str) -> Optional[str]:
+    """
+    搜尋 key = value（大小寫不敏感），回傳原始值字串（未去引號）；找不到回傳 None。
+    與 _parse_ini / _read_text 共用同一份讀檔與快取，同一檔案不論哪個檢查查詢，解碼結果都相同。
+    """
+    return _parse_ini(path).get(key.lower())
+
+
+@lru_cache(maxsize=64)
+def _key_bytes_re(key: str) -> "re.Pattern[bytes]":
+    return re.compile(re.escape(key.encode("ascii")), re.IGNORECASE)
+
+
+def _scan_ini_key(path: str, key: str) -> Optional[str]:
+    """
+    只查單一 key 時用（例如大型 TvDefaultSettings 檔只要 DIALOG），結果同 _parse_ini(path).get(key.lower())：
+    先在 mmap 上以 bytes regex 找 key（大小寫不敏感），沒出現就不必讀檔、解碼；
+    有出現則只解碼命中的那幾行來解析。命中行含非 ASCII 位元組（編碼會影響結果）時改走整份 _parse_ini。
+    """
+    key_l = key.lower()
+    with mapped_file(path) as buf:
+        done = 0
+        for m in _key_bytes_re(key).finditer(buf):
+            if m.start() < done:
+                continue
+            start = buf.rfind(b"\n", 0, m.start()) + 1
+            end = buf.find(b"\n", m.end())
+            if end < 0:
+                end = len(buf)
+            line = buf[start:end]
+            if not line.isascii():
+                return _parse_ini(path).get(key_l)
+            val = _parse_ini_text(line.decode("ascii")).get(key_l)
+            if val is not None:
+                return val
+            done = end
+    return None
+
+
+# -----------------------------
+# TvDefaultSettingsPath 類檢查共用的 CLI / 批次流程（check_AUTO_PCMODE / check_CI）
+# 各檢查只提供 check(model_ini, default_path, verbose) → res 與 report_row(res, num_condition_cols)
+# -----------------------------
+
+def parse_model_ini_for_default_settings(model_ini_path: str, root: str) -> Optional[str]:
+    """從 model.ini 找 TvDefaultSettingsPath，並解析為實體路徑。"""
+    val = _find_key_value_in_file(model_ini_path, "TvDefaultSettingsPath")
+    if val is None:
+        return None
+    return _resolve_tvconfigs_path(root, val)
+
+
+def export_default_settings_results(results: List[Dict], xlsx_path: str, report_row: Callable[[Dict, int], List[str]],
+                                    num_condition_cols: int = 5, save: bool = True) -> None:
+    """
+    多筆結果依 PID_N/others 分頁寫進報表（分頁順序依結果首次出現順序；分頁名取自 res["model_ini_path"]）：
+    - save=True（預設）立即存檔：全新檔案 → write-only 串流寫出；既有報表 → 每個分頁一次附加全部列
+    - save=False 只附加到 _tvconfigs_report.get_workbook 快取的 workbook，由呼叫端最後 save_workbook(xlsx_path) 一次存檔
+    """
+    from _tvconfigs_report import append_report_rows, write_report_rows
+
+    rows_by_sheet: Dict[str, List[List[str]]] = {}
+    for res in results:
+        rows_by_sheet.setdefault(_sheet_name_for_model(res.get("model_ini_path", "")), []).append(
+            report_row(res, num_condition_cols))
+    if save:
+        write_report_rows(rows_by_sheet, xlsx_path, num_condition_cols)
+    else:
+        append_report_rows(rows_by_sheet, xlsx_path, num_condition_cols)
+
+
+def _default_settings_parser(description: str) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--model-ini", help="path to model ini (e.g., model/1_xxx.ini)")
+    target.add_argument("--model-inis", nargs="+", metavar="GLOB",
+                        help="several model inis / globs (e.g., 'model/*.ini'); checked in one process, report written once")
+    parser.add_argument("--root", required=True, help="tvconfigs project root (maps /tvconfigs/* to here)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="verbose logs")
+
+    # 報表輸出
+    parser.add_argument("--report", action="store_true", help="export to xlsx (default: kipling.xlsx)")
+    parser.add_argument("--report-xlsx", metavar="FILE", help="export to specific xlsx file")
+
+    return parser
+
+
+def run_default_settings_check(model_ini: str, root: str, verbose: bool,
+                               check: Callable[[str, Optional[str], bool], Dict]) -> Dict:
+    """檢查單一 model.ini：確認檔案存在、解析 TvDefaultSettingsPath，其餘交給 check（console 輸出並回傳結果 dict）。"""
+    if not os.path.exists(model_ini):
+        raise SystemExit(f"[ERROR] model ini not found: {model_ini}")
+    root = os.path.abspath(os.path.normpath(root))
+
+    if verbose:
+        print(f"[INFO] model_ini: {model_ini}")
+        print(f"[INFO] root     : {root}")
+
+    # 解析 TvDefaultSettingsPath
+    default_path = parse_model_ini_for_default_settings(model_ini, root)
+    if verbose:
+        print(f"[INFO] TvDefaultSettingsPath → {default_path if default_path else '(not found)'}")
+
+    return check(model_ini, default_path, verbose)
+
+
+def default_settings_main(description: str,
+                          check: Callable[[str, Optional[str], bool], Dict],
+                          report_row: Callable[[Dict, int], List[str]],
+                          argv: Optional[List[str]] = None) -> None:
+    """
+    --model-ini 檢查一個 model.ini；--model-inis（可用 glob）則同一行程內依序檢查多個，
+    省去每個 model 重新啟動 Python / import openpyxl / 載入 xlsx 的成本，最後一次寫出報表。
+    """
+    args = _default_settings_parser(description).parse_args(argv)
+
+    if args.model_inis:
+        model_inis: List[str] = []
+        for pat in args.model_inis:
+            matches = sorted(glob.glob(pat))
+            if not matches:
+                print(f"[WARN] no model ini matches: {pat}")
+            model_inis.extend(matches)
+        model_inis = list(dict.fromkeys(model_inis))
+    else:
+        model_inis = [args.model_ini]
+
+    results = [run_default_settings_check(m, args.root, args.verbose, check) for m in model_inis]
+
+    if not (args.report or args.report_xlsx) or not results:
+        return
+    xlsx_path = args.report_xlsx if args.report_xlsx else "kipling.xlsx"
+    export_default_settings_results(results, xlsx_path, report_row)
+    sheets = list(dict.fromkeys(_sheet_name_for_model(r["model_ini_path"]) for r in results))
+    print(f"[INFO] Report appended to: {xlsx_path} (sheet: {', '.join(sheets)})")
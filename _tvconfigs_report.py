@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+_tvconfigs_report.py
+
+check_* 腳本共用的 Rules | Result | condition_* 報表輸出（openpyxl）。
+只在真的要輸出報表時才 import（check_* 於 export_* 內延遲 import），沒給 --report 就不會載入 openpyxl。
+若環境有 lxml（pip install lxml），openpyxl 會自動使用它加快讀寫 xlsx。
+
+報表 workbook 快取：
+- get_workbook(xlsx_path) 同一路徑只 load_workbook 一次，之後回傳同一個物件
+- 同一行程內多次 export_report 到同一檔案，不再每次重新解析整份 xlsx
+- 每筆寫入後呼叫 save_workbook() 立即落檔（同一份 xlsx 常有其他檢查接著寫）：
+  存檔後 workbook 仍留在快取，下次若檔案沒被別人改寫就直接沿用，不必重新 load_workbook
+- 批次（export_report(..., save=False)）由呼叫端最後自行 save_workbook() 一次；
+  不在行程結束時自動存檔，以免蓋掉其他寫入者在這之間寫進檔案的列。flush_workbooks() 可手動存全部
+- open_report(xlsx_path)：with 區塊內多個檢查共用同一個 Workbook（export_report(..., wb=wb)），離開時存檔一次
+
+CSV sidecar（--defer-report / --finalize-report）：
+- 批次中每列只附加到 <xlsx>.rows.csv（_tvconfigs_common.append_sidecar_row），不開 xlsx
+- finalize_report(xlsx_path) 最後一次把 CSV 寫進 xlsx 並刪除 CSV
+
+多列一次寫入（run_many / finalize_report）：write_report_rows(rows_by_sheet, xlsx_path)
+逐列附加：put_row(ws, values) 直接以 ws.cell 寫到下一列，不呼叫 ws.max_row（大分頁上每次都是全表掃描）
+"""
+import os
+import weakref
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from _tvconfigs_common import read_sidecar_rows, sidecar_path
+
+try:
+    from openpyxl import Workbook, load_workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Font, PatternFill
+    from openpyxl.utils import get_column_letter
+except ImportError:
+    raise SystemExit(
+        "[ERROR] 需要 openpyxl 以輸出/附加報表。\n"
+        "  安裝： pip install --user openpyxl\n"
+    )
+
+
+# -----------------------------
+# Workbook 快取
+# -----------------------------
+
+_WB_CACHE: Dict[str, Workbook] = {}
+# 載入/存檔當下磁碟上的 (mtime_ns, size)；用來判斷快取的 workbook 是否已被其他寫入者覆蓋
+_WB_STAMP: Dict[str, Optional[Tuple[int, int]]] = {}
+# 有尚未存檔變更的路徑
+_WB_DIRTY: Set[str] = set()
+
+
+def _disk_stamp(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def get_workbook(xlsx_path: str) -> Workbook:
+    """
+    取得 xlsx_path 對應的 Workbook（供寫入）；已存在則載入，否則新建。同一路徑只載入一次。
+    上次 save_workbook 之後檔案若被其他寫入者改過（且本行程沒有未存的變更），重新載入。
+    """
+    key = os.path.abspath(xlsx_path)
+    wb = _WB_CACHE.get(key)
+    if wb is not None and key not in _WB_DIRTY and _WB_STAMP.get(key) != _disk_stamp(key):
+        wb = None
+    if wb is None:
+        try:
+            wb = load_workbook(xlsx_path)
+        except Exception:
+            wb = Workbook()
+        _WB_CACHE[key] = wb
+        _WB_STAMP[key] = _disk_stamp(key)
+    _WB_DIRTY.add(key)
+    return wb
+
+
+def report_exists(xlsx_path: str) -> bool:
+    """報表已在磁碟上，或本行程已開啟（尚未存檔）皆視為存在。"""
+    return os.path.abspath(xlsx_path) in _WB_CACHE or os.path.exists(xlsx_path)
+
+
+def save_workbook(xlsx_path: str) -> None:
+    """立即存檔（移除多餘的預設 Sheet）；workbook 留在快取供下次 get_workbook 沿用。"""
+    key = os.path.abspath(xlsx_path)
+    wb = _WB_CACHE.get(key)
+    if wb is None:
+        return
+    if "Sheet" in wb.sheetnames and len(wb.sheetnames) > 1:
+        try:
+            wb.remove(wb["Sheet"])
+        except Exception:
+            pass
+    wb.save(key)
+    _WB_STAMP[key] = _disk_stamp(key)
+    _WB_DIRTY.discard(key)
+
+
+def flush_workbooks() -> None:
+    """把快取中尚未存檔的 workbook 全部存檔，並清空快取。"""
+    for key in list(_WB_DIRTY):
+        save_workbook(key)
+    _WB_CACHE.clear()
+    _WB_STAMP.clear()
+
+
+@contextmanager
+def open_report(xlsx_path: str) -> Iterator[Workbook]:
+    """
+    一次開啟報表給多個檢查共用，區塊內只在記憶體中附加，離開時存檔一次：
+
+        with open_report("kipling.xlsx") as wb:
+            for ini in model_inis:
+                check_EWBS.run(ini, root, report_xlsx="kipling.xlsx", wb=wb)
+                check_GDPR.export_report(check_GDPR.build_result(ini, ...), "kipling.xlsx", wb=wb)
+
+    區塊內不可再有其他程式直接讀寫同一份 xlsx（例如不收 wb 參數、自行 load/save 的 check_*），
+    否則離開時的存檔會蓋掉它們寫入的內容。
+    """
+    wb = get_workbook(xlsx_path)
+    try:
+        yield wb
+    finally:
+        save_workbook(xlsx_path)
+
+
+# -----------------------------
+# Rules | Result | condition_* 報表
+# -----------------------------
+
+COMMON_WIDTH = 80
+COMMON_ALIGN = Alignment(wrap_text=True, vertical="top")
+BOLD = Font(bold=True)
+# highlight=True（EWBS 等檢查的配色）：Rules 欄淺藍底、Result 為 FAIL 時淺紅底
+RULES_FILL = PatternFill(start_color="DAEEF3", end_color="DAEEF3", fill_type="solid")
+FAIL_FILL = PatternFill(start_color="FDE9D9", end_color="FDE9D9", fill_type="solid")
+
+
+# 已設好欄寬與表頭樣式的 worksheet → (total_cols, 當時的 max_column, 欄寬)。
+# 同一個 Worksheet 物件不必每附加一列就重設一次；重新載入的 workbook 是新物件，會再設一次
+_STYLED_SHEETS: "weakref.WeakKeyDictionary[Any, Tuple[int, int, float]]" = weakref.WeakKeyDictionary()
+
+
+# worksheet → 最大欄號。ws.max_row / ws.max_column / ws[row] 每次都掃過整個分頁的儲存格，分頁越大越慢；
+# 逐列附加時最大欄號由這裡記錄（只有第一次碰到某個 worksheet 物件時掃一次），下一列則見 last_row
+_MAX_COLUMNS: "weakref.WeakKeyDictionary[Any, int]" = weakref.WeakKeyDictionary()
+
+
+def _max_column(ws) -> int:
+    n = _MAX_COLUMNS.get(ws)
+    if n is None:
+        n = _MAX_COLUMNS[ws] = ws.max_column
+    return n
+
+
+def last_row(ws) -> int:
+    """
+    ws 最後有資料的列號（空分頁為 0），下一列即 last_row(ws) + 1。
+    openpyxl 以私有屬性 _current_row 記錄（ws.append / ws.cell 都會更新），O(1)；
+    版本若沒有這個屬性則退回 ws.max_row（全表掃描；空分頁 max_row 也是 1，以第 1 列是否全空判斷）。
+    """
+    n = getattr(ws, "_current_row", None)
+    if n is not None:
+        return n
+    n = ws.max_row
+    if n == 1 and all(c.value is None for c in ws[1]):
+        return 0
+    return n
+
+
+def put_row(ws, values: List[Any], align_cols: Optional[int] = None) -> List[Any]:
+    """
+    以 ws.cell(row=, column=) 直接寫到 ws 的下一列（取代 ws.append + ws.max_row），回傳該列的儲存格。
+    align_cols：第 1..align_cols 欄套 COMMON_ALIGN（不足的欄補空儲存格）；
+    None 則對齊到目前分頁最大欄數（同原本 `for cell in ws[ws.max_row]`），0 則不套（表頭交給 style_sheet）。
+    """
+    row = last_row(ws) + 1
+    max_column = _max_column(ws)
+    n = max_column if align_cols is None else align_cols
+    _MAX_COLUMNS[ws] = max(max_column, len(values), n)
+
+    cells = []
+    for col, value in enumerate(values, 1):
+        cell = ws.cell(row=row, column=col, value=value)
+        if col <= n:
+            cell.alignment = COMMON_ALIGN
+        cells.append(cell)
+    for col in range(len(values) + 1, n + 1):
+        cell = ws.cell(row=row, column=col)
+        cell.alignment = COMMON_ALIGN
+        cells.append(cell)
+    return cells
+
+
+def style_sheet(ws, total_cols: int, width: float = COMMON_WIDTH) -> None:
+    """
+    欄 1..total_cols 寬度統一 width（預設 COMMON_WIDTH）、表頭列粗體 + 換行置頂（請在附加資料列之後呼叫）。
+    同一個 worksheet 只設一次；欄數變多（total_cols 或最大欄數增加）或換了欄寬時才重設。
+    """
+    done = _STYLED_SHEETS.get(ws)
+    max_column = _max_column(ws)
+    if done is not None and done[0] >= total_cols and done[1] >= max_column and done[2] == width:
+        return
+    for c in range(1, total_cols + 1):
+        ws.column_dimensions[get_column_letter(c)].width = width
+    for cell in ws[1]:  # header
+        cell.font = BOLD
+        cell.alignment = COMMON_ALIGN
+    _STYLED_SHEETS[ws] = (total_cols, max_column, width)
+
+
+# highlight 參數：bool（整批相同），或 {sheet: [每列是否套色]}（finalize_report 依 CSV 逐列記錄）
+Highlight = Union[bool, Dict[str, List[bool]]]
+
+
+# paint 參數：逐列上色 callback(cells, values)，給配色規則與 highlight 不同的檢查（例如 check_cltv 依 condition 內容上色）
+Painter = Callable[[List[Any], List[Any]], None]
+
+
+def _row_flags(highlight: Highlight, sheet_name: str, n_rows: int) -> List[bool]:
+    if isinstance(highlight, dict):
+        return highlight.get(sheet_name) or [False] * n_rows
+    return [highlight] * n_rows
+
+
+def _apply_highlight(cells: List[Any], values: List[Any]) -> None:
+    """Rules 欄套 RULES_FILL，Result 為 FAIL 時套 FAIL_FILL。"""
+    if cells:
+        cells[0].fill = RULES_FILL
+    if len(cells) > 1 and len(values) > 1 and values[1] == "FAIL":
+        cells[1].fill = FAIL_FILL
+
+
+def _report_headers(num_condition_cols: int = 5) -> List[str]:
+    return ["Rules", "Result"] + [f"condition_{i}" for i in range(1, num_condition_cols + 1)]
+
+
+def append_report_rows(rows_by_sheet: Dict[str, List[List[Any]]], xlsx_path: str = "kipling.xlsx",
+                       num_condition_cols: int = 5, highlight: Highlight = False) -> None:
+    """
+    附加多列到既有報表（分頁不存在則建立並寫表頭），使用 get_workbook 快取的 workbook。
+    新列以 put_row 直接寫入，欄寬/表頭樣式由 style_sheet 每頁只設一次；新列共用同一個 COMMON_ALIGN。
+    （kipling.xlsx 常與其他檢查共用且帶有各自的樣式，所以附加時不改成 write-only 重寫整份檔案）
+    """
+    wb = get_workbook(xlsx_path)
+    total_cols = 2 + num_condition_cols
+    for sheet_name, rows in rows_by_sheet.items():
+        if sheet_name in wb.sheetnames:
+            ws = wb[sheet_name]
+        else:
+            ws = wb.create_sheet(title=sheet_name)
+            put_row(ws, _report_headers(num_condition_cols), align_cols=0)
+
+        for values, hl in zip(rows, _row_flags(highlight, sheet_name, len(rows))):
+            cells = put_row(ws, values)
+            if hl:
+                _apply_highlight(cells, values)
+        style_sheet(ws, total_cols)
+
+
+def append_report_row(row: List[Any], sheet_name: str, xlsx_path: str = "kipling.xlsx",
+                      num_condition_cols: int = 5) -> None:
+    """附加單列（見 append_report_rows）。"""
+    append_report_rows({sheet_name: [row]}, xlsx_path, num_condition_cols)
+
+
+def write_report_batch(rows_by_sheet: Dict[str, List[List[Any]]], xlsx_path: str = "kipling.xlsx",
+                       num_condition_cols: int = 5, highlight: Highlight = False, width: float = COMMON_WIDTH,
+                       paint: Optional[Painter] = None, align_cols: Optional[int] = None) -> None:
+    """
+    多個分頁的資料列一次寫出（openpyxl write-only 模式，逐列串流，不載入既有檔案）：
+    - 會覆寫 xlsx_path；要附加到既有報表請用 append_report_rows
+    - 分頁順序依 rows_by_sheet 的順序
+    - highlight=True：Rules 欄套 RULES_FILL，Result 為 FAIL 時套 FAIL_FILL；paint：另外逐列呼叫 paint(cells, values)
+    - width：欄寬（預設 COMMON_WIDTH）
+    - align_cols：None 則每個值都套 COMMON_ALIGN；給定時同 put_row(ws, values, align_cols)，
+      只有第 1..align_cols 欄套用（不足的欄補空儲存格），與就地附加的結果相同
+    - 建議安裝 lxml（pip install lxml），openpyxl 會自動使用以加快存檔
+    """
+    if not rows_by_sheet:
+        return
+    wb = Workbook(write_only=True)
+    total_cols = 2 + num_condition_cols
+    for sheet_name, rows in rows_by_sheet.items():
+        ws = wb.create_sheet(title=sheet_name)
+        for c in range(1, total_cols + 1):
+            ws.column_dimensions[get_column_letter(c)].width = width
+
+        # 樣式物件整份共用（COMMON_ALIGN / BOLD），不逐格建立
+        header = []
+        for value in _report_headers(num_condition_cols):
+            cell = WriteOnlyCell(ws, value=value)
+            cell.font = BOLD
+            cell.alignment = COMMON_ALIGN
+            header.append(cell)
+        ws.append(header)
+
+        for values, hl in zip(rows, _row_flags(highlight, sheet_name, len(rows))):
+            n = len(values) if align_cols is None else align_cols
+            row = []
+            for col, value in enumerate(values, 1):
+                cell = WriteOnlyCell(ws, value=value)
+                if col <= n:
+                    cell.alignment = COMMON_ALIGN
+                row.append(cell)
+            for _ in range(len(values), n):
+                cell = WriteOnlyCell(ws)
+                cell.alignment = COMMON_ALIGN
+                row.append(cell)
+            if hl:
+                _apply_highlight(row, values)
+            if paint is not None:
+                paint(row, values)
+            ws.append(row)
+
+    wb.save(xlsx_path)
+
+
+def write_report_rows(rows_by_sheet: Dict[str, List[List[Any]]], xlsx_path: str = "kipling.xlsx",
+                      num_condition_cols: int = 5, highlight: Highlight = False) -> None:
+    """
+    一次寫入多列並落檔：xlsx 不存在 → write_report_batch（write-only）；已存在 → append_report_rows 後立即存檔。
+    """
+    if report_exists(xlsx_path):
+        append_report_rows(rows_by_sheet, xlsx_path, num_condition_cols, highlight=highlight)
+        save_workbook(xlsx_path)
+    else:
+        write_report_batch(rows_by_sheet, xlsx_path, num_condition_cols, highlight=highlight)
+
+
+# -----------------------------
+# CSV sidecar → xlsx
+# -----------------------------
+
+def finalize_report(xlsx_path: str = "kipling.xlsx", num_condition_cols: int = 5) -> List[str]:
+    """
+    把 append_sidecar_row 累積的 <xlsx_path>.rows.csv 一次寫進 xlsx_path，成功後刪除 CSV：
+    （write_report_rows：xlsx 不存在 → write-only 一次寫出；已存在 → 附加後立即存檔）
+    分頁與列的順序同逐列 export_report；回傳寫入的分頁名（沒有 sidecar 則回傳空 list）。
+    """
+    sidecar = read_sidecar_rows(xlsx_path)
+    if sidecar is None:
+        return []
+    rows_by_sheet, flags_by_sheet = sidecar
+
+    write_report_rows(rows_by_sheet, xlsx_path, num_condition_cols, highlight=flags_by_sheet)
+    os.remove(sidecar_path(xlsx_path))
+    return list(rows_by_sheet)
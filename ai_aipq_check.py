@@ -15,18 +15,23 @@ Both must match (string compare after stripping) to PASS.
 """
 
 import argparse
+import functools
 import os
 import re
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, Iterator, List, Optional, Tuple, Any
 
 # -----------------------------
 # Report helpers (style aligned with tv_multi_standard_validation.py and pic_mode_test.py)
 # -----------------------------
 
+_PID_RE = re.compile(r"^(\d+)_")
+
+@functools.lru_cache(maxsize=1024)
 def _sheet_name_for_model(model_ini_path: str) -> str:
     base = os.path.basename(model_ini_path or "")
-    m = re.match(r"^(\d+)_", base)
+    m = _PID_RE.match(base)
     if m:
         return f"PID_{int(m.group(1))}"
     return "others"
@@ -40,19 +45,58 @@ def _ensure_openpyxl():
             "  安裝： pip install --user openpyxl\n"
         )
 
-def export_report(res: dict, xlsx_path: str = "kipling.xlsx", num_condition_cols: int = 5) -> None:
+def open_report(xlsx_path: str):
+    """開啟既有 xlsx，不存在或無法讀取則新建。"""
+    _ensure_openpyxl()
+    from openpyxl import Workbook, load_workbook
+    try:
+        return load_workbook(xlsx_path)
+    except Exception:
+        return Workbook()
+
+def save_report(wb, xlsx_path: str) -> None:
+    """移除預設 Sheet（若還有其他分頁）後存檔。"""
+    if "Sheet" in wb.sheetnames and len(wb.sheetnames) > 1:
+        try:
+            wb.remove(wb["Sheet"])
+        except Exception:
+            pass
+    wb.save(xlsx_path)
+
+@contextmanager
+def report_session(xlsx_path: str) -> Iterator[Any]:
+    """
+    多次 export_report() 共用同一個 workbook，離開時才存檔一次，
+    避免每列都重新 load/save 整個 xlsx。
+    """
+    wb = open_report(xlsx_path)
+    yield wb
+    save_report(wb, xlsx_path)
+
+@functools.lru_cache(maxsize=None)
+def _report_styles() -> Dict[str, Any]:
+    """報表樣式物件只建立一次（openpyxl 延遲載入，因此不放在模組頂層）"""
+    from openpyxl.styles import Alignment, Font, PatternFill
+    return {
+        "align": Alignment(wrap_text=True, vertical="top"),
+        "bold": Font(bold=True),
+        "rules_fill": PatternFill(start_color="DAEEF3", end_color="DAEEF3", fill_type="solid"),
+        "failed_fill": PatternFill(start_color="FDE9D9", end_color="FDE9D9", fill_type="solid"),
+    }
+
+def export_report(res: dict, xlsx_path: str = "kipling.xlsx", num_condition_cols: int = 5, wb: Any = None) -> None:
     """
     表頭固定: Rules, Result, condition_1, condition_2, ...
     欄位無值填 'N/A'，所有欄同寬、換行、垂直置頂。依 model.ini 前綴分頁。
+    有傳入 wb（見 report_session）時只寫入該 workbook，存檔由呼叫端負責。
     """
     _ensure_openpyxl()
-    from openpyxl import Workbook, load_workbook
-    from openpyxl.styles import Alignment, Font, PatternFill
     from openpyxl.utils import get_column_letter
 
+    styles = _report_styles()
     COMMON_WIDTH = 80
-    COMMON_ALIGN = Alignment(wrap_text=True, vertical="top")
-    BOLD = Font(bold=True)
+    COMMON_ALIGN = styles["align"]
+    BOLD = styles["bold"]
 
     def _na(s: Optional[str]) -> str:
         s = (s or "").strip()
@@ -61,10 +105,9 @@ def export_report(res: dict, xlsx_path: str = "kipling.xlsx", num_condition_cols
     sheet_name = _sheet_name_for_model(res.get("model_ini", ""))
 
     # 開啟或新建 xlsx
-    try:
-        wb = load_workbook(xlsx_path)
-    except Exception:
-        wb = Workbook()
+    standalone = wb is None
+    if standalone:
+        wb = open_report(xlsx_path)
 
     # 建立或取得 sheet
     if sheet_name in wb.sheetnames:
@@ -73,6 +116,13 @@ def export_report(res: dict, xlsx_path: str = "kipling.xlsx", num_condition_cols
         ws = wb.create_sheet(title=sheet_name)
         headers = ["Rules", "Result"] + [f"condition_{i}" for i in range(1, num_condition_cols + 1)]
         ws.append(headers)
+        # 欄寬與首列樣式只在建立 sheet 時設定一次
+        for col_idx in range(1, len(headers) + 1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = COMMON_WIDTH
+        # 首列加粗並置頂
+        for cell in ws[1]:
+            cell.font = BOLD
+            cell.alignment = COMMON_ALIGN
 
     # 準備資料
     rules = f"7. 如果平台有 support AIPQ 要記的開 AIPQ\n" \
@@ -92,8 +142,8 @@ def export_report(res: dict, xlsx_path: str = "kipling.xlsx", num_condition_cols
     last_row = ws.max_row
 
     # 給儲存格指派上色
-    rules_color = PatternFill(start_color="DAEEF3", end_color="DAEEF3", fill_type="solid")
-    failed_color = PatternFill(start_color="FDE9D9", end_color="FDE9D9", fill_type="solid")
+    rules_color = styles["rules_fill"]
+    failed_color = styles["failed_fill"]
     # 上色
     first_cell = ws.cell(row=last_row, column=1)  # 欄位1對應的是 'A' 列
     first_cell.fill = rules_color
@@ -106,49 +156,29 @@ def export_report(res: dict, xlsx_path: str = "kipling.xlsx", num_condition_cols
     if conds[2] != "AIPQ = 0":
         ws.cell(row=last_row, column=5).fill = failed_color
 
-    # 欄寬/置頂/換行
-    total_cols = 2 + num_condition_cols
-    for col_idx in range(1, total_cols + 1):
-        ws.column_dimensions[get_column_letter(col_idx)].width = COMMON_WIDTH
-
-    # 首列加粗並置頂
-    for cell in ws[1]:
-        cell.font = BOLD
-        cell.alignment = COMMON_ALIGN
     # 本列置頂
     for cell in ws[last_row]:
         cell.alignment = COMMON_ALIGN
 
-    # 移除預設 Sheet
-    if "Sheet" in wb.sheetnames and len(wb.sheetnames) > 1:
-        try:
-            wb.remove(wb["Sheet"])
-        except Exception:
-            pass
-
-    wb.save(xlsx_path)
+    if standalone:
+        save_report(wb, xlsx_path)
 
 # -----------------------------
 # Core parsing helpers (path mapping & file reading)
 # -----------------------------
 
 def _read_text(path: str) -> str:
-    for enc in ("utf-8", "latin-1", "utf-16"):
-        try:
-            with open(path, "r", encoding=enc) as f:
-                return f.read()
-        except UnicodeDecodeError:
-            continue
-        except FileNotFoundError:
-            raise
-    with open(path, "r") as f:
-        return f.read()
-
-def _strip_comment(line: str) -> str:
-    # 去掉 # 或 ; 後面的註解
-    line = line.split("#", 1)[0]
-    line = line.split(";", 1)[0]
-    return line.strip()
+    """Read the file once as bytes, then decode by BOM sniff (UTF-8/UTF-16), UTF-8, or latin-1."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:3] == b"\xef\xbb\xbf":
+        return data[3:].decode("utf-8", errors="replace")
+    if data[:2] in (b"\xff\xfe", b"\xfe\xff"):
+        return data.decode("utf-16", errors="replace")
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode("latin-1")
 
 def _resolve_tvconfigs_path(root: str, tvconfigs_like: str) -> str:
     """
@@ -168,6 +198,9 @@ def _resolve_tvconfigs_path(root: str, tvconfigs_like: str) -> str:
 # Model.ini → TvDefaultSettingsPath
 # -----------------------------
 
+# 第一個 TvDefaultSettingsPath = "<path>"（引號可省略，# / ; 之後為註解）
+_TDS_RE = re.compile(r'^[ \t]*TvDefaultSettingsPath[ \t]*=[ \t]*"?([^"\s#;][^"\r\n#;]*)', re.MULTILINE | re.IGNORECASE)
+
 def parse_model_ini_for_TvDefaultSettings(model_ini_path: str, root: str) -> Optional[str]:
     """
     從 model.ini 找:
@@ -175,21 +208,18 @@ def parse_model_ini_for_TvDefaultSettings(model_ini_path: str, root: str) -> Opt
     回傳對應到檔案系統的路徑（已映射到 --root）
     """
     txt = _read_text(model_ini_path)
-    TvDefaultSettings_path = None
-    for raw in txt.splitlines():
-        line = _strip_comment(raw)
-        if not line:
-            continue
-        m = re.match(r'^\s*TvDefaultSettingsPath\s*=\s*"?([^"]+)"?\s*$', line, re.IGNORECASE)
-        if m:
-            TvDefaultSettings_path = _resolve_tvconfigs_path(root, m.group(1).strip())
-            break
-    return TvDefaultSettings_path
+    m = _TDS_RE.search(txt)
+    if m:
+        return _resolve_tvconfigs_path(root, m.group(1).strip())
+    return None
 
 # -----------------------------
 # TvDefaultSetting_ini parsing
 # -----------------------------
 
+# AI / AIPQ = value（值到 # 或 ; 註解為止），一次 finditer 掃完整份檔案
+_AI_KV_RE = re.compile(r"^[ \t]*(AI|AIPQ)[ \t]*=[ \t]*([^#;\r\n]*)", re.MULTILINE | re.IGNORECASE)
+
 def parse_TvDefaultSettings_ai_flags(tvDefaultSettings_ini_path: str) -> Dict[str, str]:
     """
     解析簡單 key=value，忽略註解與空白。
@@ -200,14 +230,8 @@ def parse_TvDefaultSettings_ai_flags(tvDefaultSettings_ini_path: str) -> Dict[st
         return out
 
     txt = _read_text(tvDefaultSettings_ini_path)
-    for raw in txt.splitlines():
-        line = _strip_comment(raw)
-        if not line or "=" not in line:
-            continue
-        key, val = line.split("=", 1)
-        ku = key.strip().upper()
-        if ku in {"AI", "AIPQ"}:
-            out[ku] = val.strip()
+    for m in _AI_KV_RE.finditer(txt):
+        out[m.group(1).upper()] = m.group(2).strip()
     return out
 
 # -----------------------------
@@ -354,7 +378,8 @@ def main():
             "vals": vals,
             "notes": notes,
         }
-        export_report(res, xlsx_path=xlsx_path)
+        with report_session(xlsx_path) as wb:
+            export_report(res, xlsx_path=xlsx_path, wb=wb)
         sheet = _sheet_name_for_model(model_ini)
         print(f"[INFO] Report appended to: {xlsx_path} (sheet: {sheet})")
 
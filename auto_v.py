@@ -6,34 +6,92 @@ tvconfigs_path_check.py
 """
 
 import argparse
+import bisect
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
 import re
-from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 # 允許的副檔名（不含點）
 DEFAULT_EXTS = {"ini", "bin", "dat", "img", "xml", "json", "png", "jpg", "webp"}
 
-# 抓出 ini 行內所有 /tvconfigs/... 片段（直到空白/引號/; 結束）
-TV_PATH_RE = re.compile(r'(/tvconfigs/[^\s";]+)')
+# 抓出 ini 內所有 /tvconfigs/... 片段（直到空白/引號/; 結束）；直接對整個檔案 bytes 掃描
+TV_PATH_RE = re.compile(rb'(/tvconfigs/[^\s";]+)')
 
-# 粗略抓 key=val，僅為了報告顯示，避免誤解析不影響檢查
-KEYVAL_RE = re.compile(r'^\s*([^;#=\s][^=]{0,80}?)\s*=\s*(.*)$')
+NEWLINE_RE = re.compile(rb"\n")
 
-class Ref(NamedTuple):
-    ini_file: Path
-    line_no: int
-    line_preview: str
-    raw_tv_path: str
-    resolved_path: Path
+@lru_cache(maxsize=None)
+def _tv_path_ext_re(allowed_exts: frozenset) -> re.Pattern:
+    """
+    TV_PATH_RE 加上副檔名判斷的單一 regex：切 token 的方式與 TV_PATH_RE 相同，
+    但只有最後一段檔名（? 之前、尾端 / 去掉）的副檔名在 allowed_exts 內時 group("ext") 才有值，
+    規則同 looks_like_file_of_interest，一次掃描即可，不必再逐個參照判斷。
+    """
+    exts = b"|".join(re.escape(e.encode()) for e in sorted(allowed_exts, key=len, reverse=True)) or b"(?!)"
+    return re.compile(
+        rb'(/tvconfigs/(?:[^\s";?]*[^\s";?/]\.(?P<ext>(?i:' + exts + rb'))/*(?=[?\s";]|\Z))?[^\s";]*)'
+    )
+
+class Refs:
+    """
+    參照清單（SoA）：五個平行 list，第 i 筆參照即各 list 的第 i 個元素。
+    避免每筆參照都配置一個 tuple + Path；resolved_path 以 str 存放。
+    """
+    __slots__ = ("ini_file", "line_no", "line_preview", "raw_tv_path", "resolved_path")
+
+    def __init__(self) -> None:
+        self.ini_file: List[Path] = []
+        self.line_no: List[int] = []
+        self.line_preview: List[str] = []
+        self.raw_tv_path: List[str] = []
+        self.resolved_path: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.line_no)
+
+    def append(self, ini_file: Path, line_no: int, line_preview: str, raw_tv_path: str, resolved_path: str) -> None:
+        self.ini_file.append(ini_file)
+        self.line_no.append(line_no)
+        self.line_preview.append(line_preview)
+        self.raw_tv_path.append(raw_tv_path)
+        self.resolved_path.append(resolved_path)
+
+    def extend(self, other: "Refs") -> None:
+        self.ini_file.extend(other.ini_file)
+        self.line_no.extend(other.line_no)
+        self.line_preview.extend(other.line_preview)
+        self.raw_tv_path.extend(other.raw_tv_path)
+        self.resolved_path.extend(other.resolved_path)
+
+def _iter_ini_paths(top: str) -> Iterable[str]:
+    """os.scandir 遞迴（先列本層 .ini，再依序進子目錄），只比對檔名字尾，不為每個項目建 Path"""
+    try:
+        it = os.scandir(top)
+    except OSError:
+        return
+    subdirs: List[str] = []
+    with it:
+        for entry in it:
+            try:
+                if entry.is_dir():
+                    subdirs.append(entry.path)
+                elif entry.name.endswith(".ini") and entry.is_file():
+                    # 跳過隱藏或非一般檔案
+                    yield entry.path
+            except OSError:
+                continue
+    for d in subdirs:
+        yield from _iter_ini_paths(d)
 
 def iter_ini_files(root: Path) -> Iterable[Path]:
     """遞迴尋找所有 .ini（含 sys/model/tvserv_ini/...）"""
-    for p in root.rglob("*.ini"):
-        # 跳過隱藏或非一般檔案
-        if p.is_file():
-            yield p
+    for p in _iter_ini_paths(str(root)):
+        yield Path(p)
 
+@lru_cache(maxsize=None)
 def sanitize_tv_path(p: str) -> str:
     """去掉可能的收尾符號（逗號、右括號、尾巴的引號/分號等）"""
     return p.rstrip('",; \t\r\n)')
@@ -41,51 +99,80 @@ def sanitize_tv_path(p: str) -> str:
 def looks_like_file_of_interest(tv_path: str, allowed_exts: Set[str]) -> bool:
     """只檢查我們關心的副檔名（或沒有副檔名但仍想檢）"""
     # 把查詢字串（例如 ?v=）等簡單剔除
-    base = tv_path.split("?")[0]
-    # 取副檔名（不含點），大小寫忽略
-    ext = Path(base).suffix.lower().lstrip(".")
-    if not ext:
+    base = tv_path.split("?", 1)[0].rstrip("/")
+    # 取最後一段檔名的副檔名（不含點），大小寫忽略；規則同 Path.suffix，但不建 Path 物件
+    name = base[base.rfind("/") + 1:]
+    i = name.rfind(".")
+    if not 0 < i < len(name) - 1:
         # 沒有副檔名：通常是目錄或特殊檔案，預設不檢；如要檢，可在此返回 True
         return False
-    return ext in allowed_exts
+    return name[i + 1:].lower() in allowed_exts
 
-def resolve_to_project(root: Path, tv_path: str, prefix_map: Optional[Dict[str, Path]] = None) -> Optional[Path]:
+def resolve_to_project(root: Path, tv_path: str, prefix_map: Optional[Dict[str, Path]] = None) -> Optional[str]:
     """
     把 /tvconfigs/... 這類邏輯路徑，映射成專案中的實體檔案路徑。
     預設：/tvconfigs/xxx  ->  root/xxx
     你也可在 prefix_map 補更多映射（例如不同專案自訂前綴）。
     """
-    tv_path = sanitize_tv_path(tv_path)
     prefix_map = prefix_map or {"/tvconfigs/": root}
+    # 同一個 /tvconfigs/... 常被多個 ini 引用：以 (tv_path, 前綴映射) 快取，重複的參照直接共用同一個字串
+    return _resolve_cached(tv_path, tuple(prefix_map.items()))
 
-    for prefix, base in prefix_map.items():
+@lru_cache(maxsize=None)
+def _resolve_cached(tv_path: str, prefixes: Tuple[Tuple[str, Path], ...]) -> Optional[str]:
+    tv_path = sanitize_tv_path(tv_path)
+    for prefix, base in prefixes:
         if tv_path.startswith(prefix):
             rel = tv_path[len(prefix):]  # 去掉前綴
-            return (base / rel).resolve()
+            return os.path.normpath(os.path.join(base, rel))
     return None  # 非我們能解析的前綴（目前僅處理 /tvconfigs/）
 
-def scan_ini_for_tv_paths(ini_file: Path, root: Path, allowed_exts: Set[str], prefix_map: Optional[Dict[str, Path]]) -> List[Ref]:
-    """逐行掃描 ini，找出 /tvconfigs/... 參照並回傳 Ref 清單"""
-    refs: List[Ref] = []
-    with ini_file.open("r", encoding="utf-8", errors="ignore") as f:
-        for i, raw_line in enumerate(f, start=1):
-            line = raw_line.strip()
-            if not line or line.startswith(("#", ";")):
-                continue  # 跳過註解/空行
-            matches = TV_PATH_RE.findall(line)
-            if not matches:
-                continue
-            # 擷取 key=value 片段做報告 preview（避免整行過長）
-            m = KEYVAL_RE.match(line)
-            preview = (m.group(0) if m else line)[:200]
-
-            for tv_path in matches:
-                if not looks_like_file_of_interest(tv_path, allowed_exts):
-                    continue
-                resolved = resolve_to_project(root, tv_path, prefix_map)
-                if resolved is None:
-                    continue
-                refs.append(Ref(ini_file=ini_file, line_no=i, line_preview=preview, raw_tv_path=tv_path, resolved_path=resolved))
+def build_existing_paths(root: Path) -> Set[str]:
+    """一次 os.walk 收集 root 下所有檔案與目錄的路徑，之後用 set 查詢取代逐一 exists()"""
+    existing: Set[str] = {str(root)}
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in dirnames:
+            existing.add(os.path.join(dirpath, name))
+        for name in filenames:
+            existing.add(os.path.join(dirpath, name))
+    return existing
+
+def scan_ini_for_tv_paths(ini_file: Path, root: Path, allowed_exts: Set[str], prefix_map: Optional[Dict[str, Path]]) -> Refs:
+    """整個檔案一次 regex 掃描，找出 /tvconfigs/... 參照並回傳 Refs（行號以換行位置二分搜尋）"""
+    refs = Refs()
+    # 以 bytes 讀入（不經文字解碼），只有含命中的那一行才解碼
+    with open(ini_file, "rb") as f:
+        buf = f.read()
+    nls: Optional[List[int]] = None
+    cur_line = -1
+    skip_line = False
+    preview = ""
+    for mt in _tv_path_ext_re(frozenset(allowed_exts)).finditer(buf):
+        raw_path = mt.group(1)
+        if raw_path.isascii():
+            if mt.group("ext") is None:
+                continue  # 不是我們關心的副檔名
+        elif not looks_like_file_of_interest(raw_path.decode("utf-8", "ignore"), allowed_exts):
+            continue  # 非 ASCII（可能含無法解碼的 byte）：以解碼後字串判斷，與逐行版本一致
+        if nls is None:
+            nls = [m.start() for m in NEWLINE_RE.finditer(buf)]
+        idx = bisect.bisect_right(nls, mt.start())
+        if idx != cur_line:
+            cur_line = idx
+            ls = nls[idx - 1] + 1 if idx else 0
+            le = nls[idx] if idx < len(nls) else len(buf)
+            line = buf[ls:le].decode("utf-8", "ignore").strip()
+            skip_line = line.startswith(("#", ";"))  # 跳過註解行
+            # 報告 preview：整行（已 strip）截前 200 字，避免整行過長
+            preview = line[:200]
+        if skip_line:
+            continue
+
+        tv_path = raw_path.decode("utf-8", "ignore")
+        resolved = resolve_to_project(root, tv_path, prefix_map)
+        if resolved is None:
+            continue
+        refs.append(ini_file, idx + 1, preview, tv_path, resolved)
     return refs
 
 def main():
@@ -96,6 +183,8 @@ def main():
                         help=f"要檢查的副檔名（逗號分隔），預設：{','.join(sorted(DEFAULT_EXTS))}")
     parser.add_argument("--fail-warning", action="store_true",
                         help="把所有缺檔當 Blocking（退出碼非 0）")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="平行掃描 ini 的 process 數，預設 1 = 不平行；0 = CPU 數")
     args = parser.parse_args()
 
     root: Path = args.root.resolve()
@@ -106,22 +195,36 @@ def main():
     allowed_exts = {e.strip().lower() for e in args.exts.split(",") if e.strip()}
     prefix_map = {"/tvconfigs/": root}  # 如需擴充其它前綴，可在此加入
 
-    all_refs: List[Ref] = []
-    for ini in iter_ini_files(root):
-        all_refs.extend(scan_ini_for_tv_paths(ini, root, allowed_exts, prefix_map))
+    ini_files = list(iter_ini_files(root))
+    scan = partial(scan_ini_for_tv_paths, root=root, allowed_exts=allowed_exts, prefix_map=prefix_map)
+    all_refs = Refs()
+    # 預設不開 process pool（小專案啟動 worker 的成本比省下的還多），需要時以 --jobs 指定
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    if jobs > 1 and len(ini_files) > 1:
+        # 各 ini 掃描互不相依，分給多個 process；map 保持原檔案順序
+        chunksize = max(1, len(ini_files) // (4 * jobs))
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for refs in pool.map(scan, ini_files, chunksize=chunksize):
+                all_refs.extend(refs)
+    else:
+        for ini in ini_files:
+            all_refs.extend(scan(ini))
 
-    missing: List[Ref] = [r for r in all_refs if not r.resolved_path.exists()]
+    # 先查 set；不在 set 內的（root 外、經 symlink 目錄等）再以 exists() 確認
+    existing = build_existing_paths(root)
+    missing: List[int] = [i for i, p in enumerate(all_refs.resolved_path)
+                          if p not in existing and not os.path.exists(p)]
 
     # 報告
     print(f"掃描根目錄：{root}")
     print(f"發現參照總數：{len(all_refs)}，缺檔：{len(missing)}")
     if missing:
         print("\n=== 缺檔清單（Blocking 建議修正） ===")
-        for r in missing:
-            print(f"- {r.ini_file.relative_to(root)}:{r.line_no}")
-            print(f"  key/line : {r.line_preview}")
-            print(f"  tv_path  : {r.raw_tv_path}")
-            print(f"  resolved : {r.resolved_path}")
+        for i in missing:
+            print(f"- {all_refs.ini_file[i].relative_to(root)}:{all_refs.line_no[i]}")
+            print(f"  key/line : {all_refs.line_preview[i]}")
+            print(f"  tv_path  : {all_refs.raw_tv_path[i]}")
+            print(f"  resolved : {all_refs.resolved_path[i]}")
     else:
         print("✔ 未發現缺檔。")
 
@@ -22,72 +22,19 @@ python3.8 check_is_support_gdpr.py --model-ini model/1_xxx.ini --root . --report
 
 import argparse
 import os
-import re
-from typing import Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from _tvconfigs_common import _na, _parse_ini, _sheet_name_for_model, append_sidecar_row, append_sidecar_rows, map_models
 
 # -----------------------------
 # Utilities for report（比照 tv_multi_standard_validation.py 風格）
 # -----------------------------
 
-def _sheet_name_for_model(model_ini_path: str) -> str:
-    """
-    根據 model.ini 檔名的前綴決定頁簽：
-      - 前綴是數字 N → 'PID_N'
-      - 其他 → 'others'
-    例: '1_EU_XXX.ini' → 'PID_1'
-    """
-    base = os.path.basename(model_ini_path or "")
-    m = re.match(r"^(\d+)_", base)
-    if m:
-        return f"PID_{int(m.group(1))}"
-    return "others"
-
-
-def _ensure_openpyxl():
-    try:
-        import openpyxl  # noqa
-    except ImportError:
-        raise SystemExit(
-            "[ERROR] 需要 openpyxl 以支援報表輸出與附加。\n"
-            "  安裝： pip install --user openpyxl\n"
-        )
-
-
-def export_report(res: dict, xlsx_path: str = "kipling.xlsx", num_condition_cols: int = 5) -> None:
-    """
-    欄位無值時以 'N/A' 填入。依 model.ini 檔名前綴分頁（PID_1、PID_2…；非數字→others），既有資料則附加。
-    表頭固定為: Rules, Result, condition_1, condition_2, condition_3, ...
-    統一：所有欄位同寬、自動換行、垂直置頂（包含表頭）。
-    """
-    _ensure_openpyxl()
-    from openpyxl import Workbook, load_workbook
-    from openpyxl.styles import Alignment, Font, PatternFill
-    from openpyxl.utils import get_column_letter
-
-    COMMON_WIDTH = 80
-    COMMON_ALIGN = Alignment(wrap_text=True, vertical="top")
-    BOLD = Font(bold=True)
-
-    def _na(s: str) -> str:
-        s = (s or "").strip()
-        return s if s else "N/A"
+def _report_row(res: dict, num_condition_cols: int = 5) -> Tuple[str, List[str]]:
+    """build_result 結果 → (分頁名, 報表列)；欄位無值時以 'N/A' 填入。"""
 
     sheet_name = _sheet_name_for_model(res.get("model_ini", ""))
 
-    # 開啟或新建 xlsx
-    try:
-        wb = load_workbook(xlsx_path)
-    except Exception:
-        wb = Workbook()
-
-    # 建立或取得 sheet
-    if sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-    else:
-        ws = wb.create_sheet(title=sheet_name)
-        headers = ["Rules", "Result"] + [f"condition_{i}" for i in range(1, num_condition_cols + 1)]
-        ws.append(headers)
-
     # 準備資料
     rules   = "Check isSupportGDPR exists"
     result  = "PASS" if res.get("passed", False) else "FAIL"
@@ -102,59 +49,62 @@ def export_report(res: dict, xlsx_path: str = "kipling.xlsx", num_condition_cols
         "N/A",                       # condition_5
     ][:num_condition_cols]
 
-    # 寫入 row
-    row_values = [rules, result] + conds
-    ws.append(row_values)
-    last_row = ws.max_row
+    return sheet_name, [rules, result] + conds
 
-    # 套用樣式：欄寬、換行、垂直靠上
-    total_cols = 2 + num_condition_cols
-    for col_idx in range(1, total_cols + 1):
-        col_letter = get_column_letter(col_idx)
-        ws.column_dimensions[col_letter].width = COMMON_WIDTH
 
-    for cell in ws[1]:  # header
-        cell.font = BOLD
-        cell.alignment = COMMON_ALIGN
+def export_report(res: dict, xlsx_path: str = "kipling.xlsx", num_condition_cols: int = 5, wb: Any = None,
+                  defer: bool = False) -> None:
+    """
+    欄位無值時以 'N/A' 填入。依 model.ini 檔名前綴分頁（PID_1、PID_2…；非數字→others），既有資料則附加。
+    表頭固定為: Rules, Result, condition_1, condition_2, condition_3, ...
+    統一：所有欄位同寬、自動換行、垂直置頂（包含表頭）。
+    wb：由呼叫端（例如 _tvconfigs_report.open_report）管理的 Workbook；有給就直接附加，不在這裡載入/存檔。
+    defer：只把這一列附加到 CSV sidecar（不開 xlsx），之後以 --finalize-report 一次寫入。
+    """
+    sheet_name, row_values = _report_row(res, num_condition_cols)
 
-    for cell in ws[last_row]:
-        cell.alignment = COMMON_ALIGN
+    # 批次模式：只附加到 CSV sidecar，不 import openpyxl、不開 xlsx
+    if defer:
+        append_sidecar_row(row_values, sheet_name, xlsx_path)
+        return
 
-    # 移除預設 Sheet
-    if "Sheet" in wb.sheetnames and len(wb.sheetnames) > 1:
-        try:
-            wb.remove(wb["Sheet"])
-        except Exception:
-            pass
+    from _tvconfigs_report import (
+        get_workbook, put_row, report_exists, save_workbook, style_sheet, write_report_batch,
+    )
 
-    wb.save(xlsx_path)
+    # 報表還不存在：write-only 串流寫出（表頭 + 這一列），不建立一般 Workbook 的儲存格物件
+    if wb is None and not report_exists(xlsx_path):
+        write_report_batch({sheet_name: [row_values]}, xlsx_path, num_condition_cols)
+        return
 
+    # 開啟既有 xlsx（同一行程內沿用已載入的 workbook）；呼叫端給了 wb 則由呼叫端負責存檔
+    own_wb = wb is None
+    if own_wb:
+        wb = get_workbook(xlsx_path)
 
-# -----------------------------
-# Core parsing
-# -----------------------------
+    # 建立或取得 sheet
+    if sheet_name in wb.sheetnames:
+        ws = wb[sheet_name]
+    else:
+        ws = wb.create_sheet(title=sheet_name)
+        headers = ["Rules", "Result"] + [f"condition_{i}" for i in range(1, num_condition_cols + 1)]
+        put_row(ws, headers, align_cols=0)
 
-def _read_text(path: str) -> str:
-    # 寬鬆讀取，容忍常見編碼
-    for enc in ("utf-8", "latin-1", "utf-16"):
-        try:
-            with open(path, "r", encoding=enc) as f:
-                return f.read()
-        except UnicodeDecodeError:
-            continue
-        except FileNotFoundError:
-            raise
-    with open(path, "r") as f:
-        return f.read()
+    # 寫入 row（直接寫到下一列，不呼叫 ws.max_row；整列換行 & 垂直置頂）
+    put_row(ws, row_values)
 
+    # 套用樣式：欄寬、換行、垂直靠上（欄寬/表頭每個分頁只設一次）
+    style_sheet(ws, 2 + num_condition_cols)
 
-def _strip_comment(line: str) -> str:
-    # 去掉 # 或 ; 之後的註解
-    line = line.split("#", 1)[0]
-    line = line.split(";", 1)[0]
-    return line.strip()
+    # 每次立即存檔（run_tvchecks_import 會讓其他檢查接著寫同一份 xlsx），預設 Sheet 於存檔時移除
+    if own_wb:
+        save_workbook(xlsx_path)
 
 
+# -----------------------------
+# Core parsing
+# -----------------------------
+
 def _resolve_tvconfigs_path(root: str, tvconfigs_like: str) -> str:
     """
     把 "/tvconfigs/xxx/yyy.ini" 映射為 "<root>/xxx/yyy.ini"
@@ -179,19 +129,9 @@ def parse_is_support_gdpr(model_ini_path: str) -> Optional[str]:
     例如：
       isSupportGDPR = true
       IsSupportGdpr= "FALSE"
+    只取第一個有效值；整份 INI 的解析結果依 (path, mtime) 快取，與其他 check 共用。
     """
-    txt = _read_text(model_ini_path)
-
-    # 單行關鍵字解析（只取第一個命中的值）
-    pat = re.compile(r'^\s*isSupportGDPR\s*=\s*"?([^"\r\n#;]+)"?\s*$', re.IGNORECASE)
-    for raw in txt.splitlines():
-        line = _strip_comment(raw)
-        if not line:
-            continue
-        m = pat.match(line)
-        if m:
-            return m.group(1).strip()
-    return None
+    return _parse_ini(model_ini_path).get("issupportgdpr")
 
 
 def build_result(model_ini: str, value: Optional[str]) -> dict:
@@ -203,27 +143,92 @@ def build_result(model_ini: str, value: Optional[str]) -> dict:
     }
 
 
+def check_gdpr(model_ini: str, root: str = ".") -> dict:
+    """單一 model.ini：解析 isSupportGDPR → build_result（root 保留給與其他 check 相同的呼叫介面）。"""
+    return build_result(model_ini, parse_is_support_gdpr(model_ini))
+
+
+def run_many(model_inis: Iterable[str], root: str = ".", report_xlsx: Optional[str] = None,
+             max_workers: Optional[int] = 1, defer: bool = False) -> List[Dict[str, Any]]:
+    """
+    多個 model.ini 跑 check_gdpr，依輸入順序印出結果（max_workers > 1 或 0 = CPU 數時以 process pool 平行）；
+    有給 report_xlsx 則全部結果最後一次寫進報表（不逐列 load/save）；
+    defer：只附加到 CSV sidecar（不開 xlsx），之後以 --finalize-report 一次寫入。
+    """
+    results = [res for res, _ in map_models(check_gdpr, model_inis, root, max_workers=max_workers)]
+    rows_by_sheet: Dict[str, List[List[str]]] = {}
+    for res in results:
+        print(f"model_ini: {res['model_ini']}")
+        _print_result(res)
+        sheet_name, row_values = _report_row(res)
+        rows_by_sheet.setdefault(sheet_name, []).append(row_values)
+
+    if report_xlsx and results:
+        if defer:
+            for sheet_name, rows in rows_by_sheet.items():
+                append_sidecar_rows(rows, sheet_name, report_xlsx)
+        else:
+            from _tvconfigs_report import write_report_rows
+            write_report_rows(rows_by_sheet, report_xlsx)
+        print(f"[INFO] Report appended to: {report_xlsx} (sheets: {', '.join(rows_by_sheet)}){' [deferred]' if defer else ''}")
+    return results
+
+
 # -----------------------------
 # Main
 # -----------------------------
 
+def _print_result(res: dict) -> None:
+    print(f"Result : {'PASS' if res['passed'] else 'FAIL'}")
+    print(f"isSupportGDPR: {res['is_support_gdpr'] or '(N/A)'}")
+
+
+def _finalize(xlsx_path: str) -> None:
+    from _tvconfigs_report import finalize_report
+    sheets = finalize_report(xlsx_path)
+    print(f"[INFO] Deferred rows written to: {xlsx_path} (sheets: {', '.join(sheets) if sheets else 'none'})")
+
+
 def main():
     parser = argparse.ArgumentParser(description="Parse isSupportGDPR from model.ini and export to Excel report (kipling.xlsx).")
-    parser.add_argument("--model-ini", required=True, help="path to model ini (e.g., model/1_xxx.ini)")
-    parser.add_argument("--root", required=True, help="tvconfigs project root (maps /tvconfigs/* to here)")
+    parser.add_argument("--model-ini", nargs="+",
+                        help="path to model ini (e.g., model/1_xxx.ini); several → checked in one run (parallel with -j), report written once")
+    parser.add_argument("--root", help="tvconfigs project root (maps /tvconfigs/* to here)")
     parser.add_argument("-v", "--verbose", action="store_true", help="verbose logs")
 
     # 新增：--report 直接輸出到 kipling.xlsx；--report-xlsx 可指定路徑
     parser.add_argument("--report", action="store_true", help="export report to kipling.xlsx")
     parser.add_argument("--report-xlsx", metavar="FILE", help="export report to specific xlsx file")
 
+    parser.add_argument("--defer-report", action="store_true",
+                        help="batch mode: append the row to <xlsx>.rows.csv instead of opening the xlsx")
+    parser.add_argument("--finalize-report", action="store_true",
+                        help="write rows collected by --defer-report into the xlsx (may be used alone)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="worker processes for several model inis (default: 1 = no pool; 0 = CPU count)")
+
     args = parser.parse_args()
 
-    model_ini = args.model_ini
-    if not os.path.exists(model_ini):
-        raise SystemExit(f"[ERROR] model ini not found: {model_ini}")
+    xlsx_path = args.report_xlsx if args.report_xlsx else "kipling.xlsx"
+    if not (args.model_ini and args.root):
+        if not args.finalize_report:
+            parser.error("the following arguments are required: --model-ini, --root")
+        _finalize(xlsx_path)
+        return
+
+    for model_ini in args.model_ini:
+        if not os.path.exists(model_ini):
+            raise SystemExit(f"[ERROR] model ini not found: {model_ini}")
 
     root = os.path.abspath(os.path.normpath(args.root))
+    want_report = args.report or args.report_xlsx or args.defer_report
+    if len(args.model_ini) > 1:
+        run_many(args.model_ini, root, xlsx_path if want_report else None, args.jobs, defer=args.defer_report)
+        if args.finalize_report:
+            _finalize(xlsx_path)
+        return
+
+    model_ini = args.model_ini[0]
     if args.verbose:
         print(f"[INFO] model_ini: {model_ini}")
         print(f"[INFO] root     : {root}")
@@ -235,15 +240,15 @@ def main():
 
     # 輸出到 console
     res = build_result(model_ini, value)
-    print(f"Result : {'PASS' if res['passed'] else 'FAIL'}")
-    print(f"isSupportGDPR: {res['is_support_gdpr'] or '(N/A)'}")
+    _print_result(res)
 
     # 報表輸出
-    if args.report or args.report_xlsx:
-        xlsx_path = args.report_xlsx if args.report_xlsx else "kipling.xlsx"
-        export_report(res, xlsx_path=xlsx_path)
+    if want_report:
+        export_report(res, xlsx_path=xlsx_path, defer=args.defer_report)
         sheet = _sheet_name_for_model(model_ini)
-        print(f"[INFO] Report appended to: {xlsx_path} (sheet: {sheet})")
+        print(f"[INFO] Report appended to: {xlsx_path} (sheet: {sheet}){' [deferred]' if args.defer_report else ''}")
+    if args.finalize_report:
+        _finalize(xlsx_path)
 
 
 if __name__ == "__main__":
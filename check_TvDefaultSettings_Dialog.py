@@ -13,63 +13,68 @@ check_TvDefaultSettings_Dialog.py
 """
 import argparse
 import os
-import re
-from typing import Optional, List, Dict
+from typing import Any, Optional, List, Dict, Iterable, Tuple
+
+from _tvconfigs_common import _na, _parse_ini, _scan_ini_key, _sheet_name_for_model, append_sidecar_row, append_sidecar_rows, map_models
 
 
 # -----------------------------
 # Excel 報表（沿用專案風格）
 # -----------------------------
 
-def _sheet_name_for_model(model_ini_path: str) -> str:
-    """
-    以 model.ini 檔名的數字前綴決定 sheet 名：'PID_<N>'；無數字則 'others'
-    例：'1_EU_xxx.ini' → 'PID_1'
-    """
-    base = os.path.basename(model_ini_path or "")
-    m = re.match(r"^(\d+)_", base)
-    if m:
-        return f"PID_{int(m.group(1))}"
-    return "others"
+def _report_row(res: Dict, num_condition_cols: int = 5) -> Tuple[str, List[str]]:
+    """build_result 結果 → (分頁名, 報表列)；欄位無值時以 'N/A' 填入。"""
 
+    sheet_name = _sheet_name_for_model(res.get("model_ini_path", ""))
 
-def _ensure_openpyxl():
-    try:
-        import openpyxl  # noqa: F401
-    except ImportError:
-        raise SystemExit(
-            "[ERROR] 需要 openpyxl 以輸出/附加報表。\n"
-            "  安裝： pip install --user openpyxl\n"
-        )
+    # 準備資料
+    rules = "1) 解析 TvDefaultSettingsPath → 2) 開檔 → 3) 讀 DIALOG"
+    result = res.get("result_text") or "N/A"
+
+    def j(items: Optional[List[str]]) -> str:
+        return ", ".join(items or []) if items else ""
+
+    conds = [
+        f"TvDefaultSettingsPath = {_na(res.get('default_settings_path_resolved'))}",  # c1
+        f"DIALOG(raw) = {_na(res.get('dialog_raw'))}",                                # c2
+        f"Notes = {_na(res.get('notes'))}",                                           # c3
+        f"Missing = {_na(j(res.get('missing')))}",                                    # c4
+        _na(res.get("extra")),                                                       # c5(預留)
+    ][:num_condition_cols]
 
+    return sheet_name, [rules, result] + conds
 
-def export_report(res: Dict, xlsx_path: str = "kipling.xlsx", num_condition_cols: int = 5) -> None:
+
+def export_report(res: Dict, xlsx_path: str = "kipling.xlsx", num_condition_cols: int = 5, wb: Any = None,
+                  defer: bool = False) -> None:
     """
     表頭固定：Rules | Result | condition_1..N
     - 不輸出 model.ini 欄位
     - 依 PID_N/others 分頁，若 xlsx 存在則附加一列
     - 欄位等寬、換行、垂直置頂
+    wb：由呼叫端（例如 _tvconfigs_report.open_report）管理的 Workbook；有給就直接附加，不在這裡載入/存檔。
+    defer：只把這一列附加到 CSV sidecar（不開 xlsx），之後以 --finalize-report 一次寫入。
     """
-    _ensure_openpyxl()
-    from openpyxl import Workbook, load_workbook
-    from openpyxl.styles import Alignment, Font, PatternFill
-    from openpyxl.utils import get_column_letter
+    sheet_name, row_values = _report_row(res, num_condition_cols)
 
-    COMMON_WIDTH = 80
-    COMMON_ALIGN = Alignment(wrap_text=True, vertical="top")
-    BOLD = Font(bold=True)
+    # 批次模式：只附加到 CSV sidecar，不 import openpyxl、不開 xlsx
+    if defer:
+        append_sidecar_row(row_values, sheet_name, xlsx_path)
+        return
 
-    def _na(s: Optional[str]) -> str:
-        s = (s or "").strip()
-        return s if s else "N/A"
+    from _tvconfigs_report import (
+        get_workbook, put_row, report_exists, save_workbook, style_sheet, write_report_batch,
+    )
 
-    sheet_name = _sheet_name_for_model(res.get("model_ini_path", ""))
+    # 報表還不存在：write-only 串流寫出（表頭 + 這一列），不建立一般 Workbook 的儲存格物件
+    if wb is None and not report_exists(xlsx_path):
+        write_report_batch({sheet_name: [row_values]}, xlsx_path, num_condition_cols)
+        return
 
-    # 開啟或建立
-    try:
-        wb = load_workbook(xlsx_path)
-    except Exception:
-        wb = Workbook()
+    # 開啟既有 xlsx（同一行程內沿用已載入的 workbook）；呼叫端給了 wb 則由呼叫端負責存檔
+    own_wb = wb is None
+    if own_wb:
+        wb = get_workbook(xlsx_path)
 
     # 取得/建立分頁
     if sheet_name in wb.sheetnames:
@@ -77,70 +82,23 @@ def export_report(res: Dict, xlsx_path: str = "kipling.xlsx", num_condition_cols
     else:
         ws = wb.create_sheet(title=sheet_name)
         headers = ["Rules", "Result"] + [f"condition_{i}" for i in range(1, num_condition_cols + 1)]
-        ws.append(headers)
-
-    # 準備資料
-    rules = "1) 解析 TvDefaultSettingsPath → 2) 開檔 → 3) 讀 DIALOG"
-    result = res.get("result_text") or "N/A"
-
-    def j(items: Optional[List[str]]) -> str:
-        return ", ".join(items or []) if items else ""
-
-    conds = [
-        f"TvDefaultSettingsPath = {_na(res.get('default_settings_path_resolved'))}",  # c1
-        f"DIALOG(raw) = {_na(res.get('dialog_raw'))}",                                # c2
-        f"Notes = {_na(res.get('notes'))}",                                           # c3
-        f"Missing = {_na(j(res.get('missing')))}",                                    # c4
-        _na(res.get("extra")),                                                       # c5(預留)
-    ][:num_condition_cols]
-
-    ws.append([rules, result] + conds)
-    last_row = ws.max_row
+        put_row(ws, headers, align_cols=0)
 
-    # 樣式
-    total_cols = 2 + num_condition_cols
-    for c in range(1, total_cols + 1):
-        ws.column_dimensions[get_column_letter(c)].width = COMMON_WIDTH
-    for cell in ws[1]:  # header
-        cell.font = BOLD
-        cell.alignment = COMMON_ALIGN
-    for cell in ws[last_row]:
-        cell.alignment = COMMON_ALIGN
+    # 寫入 row（直接寫到下一列，不呼叫 ws.max_row；整列換行 & 垂直置頂）
+    put_row(ws, row_values)
 
-    # 移除預設 Sheet
-    if "Sheet" in wb.sheetnames and len(wb.sheetnames) > 1:
-        try:
-            wb.remove(wb["Sheet"])
-        except Exception:
-            pass
+    # 樣式（欄寬/表頭每個分頁只設一次）
+    style_sheet(ws, 2 + num_condition_cols)
 
-    wb.save(xlsx_path)
+    # 每次立即存檔（run_tvchecks_import 會讓其他檢查接著寫同一份 xlsx），預設 Sheet 於存檔時移除
+    if own_wb:
+        save_workbook(xlsx_path)
 
 
 # -----------------------------
 # 基礎解析
 # -----------------------------
 
-def _read_text(path: str) -> str:
-    for enc in ("utf-8", "latin-1", "utf-16"):
-        try:
-            with open(path, "r", encoding=enc) as f:
-                return f.read()
-        except UnicodeDecodeError:
-            continue
-        except FileNotFoundError:
-            raise
-    with open(path, "r") as f:
-        return f.read()
-
-
-def _strip_comment(line: str) -> str:
-    # 支援 '#' 或 ';' 註解
-    line = line.split("#", 1)[0]
-    line = line.split(";", 1)[0]
-    return line.strip()
-
-
 def _resolve_tvconfigs_path(root: str, tvconfigs_like: str) -> str:
     """
     /tvconfigs/... → <root>/...
@@ -158,27 +116,11 @@ def _resolve_tvconfigs_path(root: str, tvconfigs_like: str) -> str:
     return os.path.normpath(os.path.join(root, tvconfigs_like))
 
 
-def _find_key_value_in_ini_text(text: str, key: str) -> Optional[str]:
-    """
-    搜尋 key = value（忽略註解與空白、大小寫不敏感、允許引號），回傳原始值字串（未去引號）。
-    """
-    key_re = re.compile(r'^\s*' + re.escape(key) + r'\s*=\s*"?([^"\n\r]+)"?\s*$', re.IGNORECASE)
-    for raw in text.splitlines():
-        line = _strip_comment(raw)
-        if not line:
-            continue
-        m = key_re.match(line)
-        if m:
-            return m.group(1).strip()
-    return None
-
-
 def parse_model_ini_for_default_settings(model_ini_path: str, root: str) -> Optional[str]:
     """
     從 model.ini 找 TvDefaultSettingsPath，並解析為實體路徑。
     """
-    txt = _read_text(model_ini_path)
-    val = _find_key_value_in_ini_text(txt, "TvDefaultSettingsPath")
+    val = _parse_ini(model_ini_path).get("tvdefaultsettingspath")
     if val is None:
         return None
     return _resolve_tvconfigs_path(root, val)
@@ -189,10 +131,14 @@ def parse_dialog_value(default_settings_path: str) -> Optional[str]:
     讀取 default settings 檔案的 DIALOG 值，找不到回傳 None。
     保留原始字串（去除前後空白與引號/註解），不做布林/數字正規化。
     """
-    if not default_settings_path or not os.path.exists(default_settings_path):
+    if not default_settings_path:
+        return None
+    # 設定檔很大、只要一個 key：先在 bytes 上找 DIALOG，只解碼命中的行
+    # 不先 os.path.exists（多一次 stat），檔案不存在時由開檔的例外判斷
+    try:
+        val = _scan_ini_key(default_settings_path, "DIALOG")
+    except (FileNotFoundError, NotADirectoryError):
         return None
-    txt = _read_text(default_settings_path)
-    val = _find_key_value_in_ini_text(txt, "DIALOG")
     return val.strip() if val is not None else None
 
 
@@ -217,28 +163,98 @@ def build_result(model_ini: str, default_path: Optional[str], dialog_raw: Option
     }
 
 
+def check_dialog(model_ini: str, root: str) -> Dict:
+    """單一 model.ini：TvDefaultSettingsPath → DIALOG → build_result。"""
+    default_path = parse_model_ini_for_default_settings(model_ini, root)
+    dialog_val = parse_dialog_value(default_path) if default_path else None
+    return build_result(model_ini, default_path, dialog_val)
+
+
+def run_many(model_inis: Iterable[str], root: str, report_xlsx: Optional[str] = None,
+             max_workers: Optional[int] = 1, defer: bool = False) -> List[Dict]:
+    """
+    多個 model.ini 跑 check_dialog，依輸入順序印出結果（max_workers > 1 或 0 = CPU 數時以 process pool 平行）；
+    有給 report_xlsx 則全部結果最後一次寫進報表（不逐列 load/save）；
+    defer：只附加到 CSV sidecar（不開 xlsx），之後以 --finalize-report 一次寫入。
+    """
+    results = [res for res, _ in map_models(check_dialog, model_inis, root, max_workers=max_workers)]
+    rows_by_sheet: Dict[str, List[List[str]]] = {}
+    for res in results:
+        print(f"model_ini: {res['model_ini_path']}")
+        _print_result(res)
+        sheet_name, row_values = _report_row(res)
+        rows_by_sheet.setdefault(sheet_name, []).append(row_values)
+
+    if report_xlsx and results:
+        if defer:
+            for sheet_name, rows in rows_by_sheet.items():
+                append_sidecar_rows(rows, sheet_name, report_xlsx)
+        else:
+            from _tvconfigs_report import write_report_rows
+            write_report_rows(rows_by_sheet, report_xlsx)
+        print(f"[INFO] Report appended to: {report_xlsx} (sheets: {', '.join(rows_by_sheet)}){' [deferred]' if defer else ''}")
+    return results
+
+
 # -----------------------------
 # Main
 # -----------------------------
 
+def _print_result(res: Dict) -> None:
+    print(f"Result(DIALOG): {res['result_text']}")
+    if res.get("notes"):
+        print(f"Notes   : {res['notes']}")
+    if res.get("missing"):
+        print(f"Missing : {', '.join(res['missing'])}")
+
+
+def _finalize(xlsx_path: str) -> None:
+    from _tvconfigs_report import finalize_report
+    sheets = finalize_report(xlsx_path)
+    print(f"[INFO] Deferred rows written to: {xlsx_path} (sheets: {', '.join(sheets) if sheets else 'none'})")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Read TvDefaultSettingsPath → DIALOG value, and export to Excel."
     )
-    parser.add_argument("--model-ini", required=True, help="path to model ini (e.g., model/1_xxx.ini)")
-    parser.add_argument("--root", required=True, help="tvconfigs project root (maps /tvconfigs/* to here)")
+    parser.add_argument("--model-ini", nargs="+",
+                        help="path to model ini (e.g., model/1_xxx.ini); several → checked in one run (parallel with -j), report written once")
+    parser.add_argument("--root", help="tvconfigs project root (maps /tvconfigs/* to here)")
     parser.add_argument("-v", "--verbose", action="store_true", help="verbose logs")
 
     # 報表輸出
     parser.add_argument("--report", action="store_true", help="export to xlsx (default: kipling.xlsx)")
     parser.add_argument("--report-xlsx", metavar="FILE", help="export to specific xlsx file")
 
+    parser.add_argument("--defer-report", action="store_true",
+                        help="batch mode: append the row to <xlsx>.rows.csv instead of opening the xlsx")
+    parser.add_argument("--finalize-report", action="store_true",
+                        help="write rows collected by --defer-report into the xlsx (may be used alone)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="worker processes for several model inis (default: 1 = no pool; 0 = CPU count)")
+
     args = parser.parse_args()
 
-    model_ini = args.model_ini
-    if not os.path.exists(model_ini):
-        raise SystemExit(f"[ERROR] model ini not found: {model_ini}")
+    xlsx_path = args.report_xlsx if args.report_xlsx else "kipling.xlsx"
+    if not (args.model_ini and args.root):
+        if not args.finalize_report:
+            parser.error("the following arguments are required: --model-ini, --root")
+        _finalize(xlsx_path)
+        return
+
+    for model_ini in args.model_ini:
+        if not os.path.exists(model_ini):
+            raise SystemExit(f"[ERROR] model ini not found: {model_ini}")
     root = os.path.abspath(os.path.normpath(args.root))
+    want_report = args.report or args.report_xlsx or args.defer_report
+    if len(args.model_ini) > 1:
+        run_many(args.model_ini, root, xlsx_path if want_report else None, args.jobs, defer=args.defer_report)
+        if args.finalize_report:
+            _finalize(xlsx_path)
+        return
+
+    model_ini = args.model_ini[0]
 
     if args.verbose:
         print(f"[INFO] model_ini: {model_ini}")
@@ -256,18 +272,15 @@ def main():
 
     # 組裝結果 + 輸出 console
     res = build_result(model_ini, default_path, dialog_val)
-    print(f"Result(DIALOG): {res['result_text']}")
-    if res.get("notes"):
-        print(f"Notes   : {res['notes']}")
-    if res.get("missing"):
-        print(f"Missing : {', '.join(res['missing'])}")
+    _print_result(res)
 
     # Excel
-    if args.report or args.report_xlsx:
-        xlsx_path = args.report_xlsx if args.report_xlsx else "kipling.xlsx"
-        export_report(res, xlsx_path=xlsx_path)
+    if want_report:
+        export_report(res, xlsx_path=xlsx_path, defer=args.defer_report)
         sheet = _sheet_name_for_model(model_ini)
-        print(f"[INFO] Report appended to: {xlsx_path} (sheet: {sheet})")
+        print(f"[INFO] Report appended to: {xlsx_path} (sheet: {sheet}){' [deferred]' if args.defer_report else ''}")
+    if args.finalize_report:
+        _finalize(xlsx_path)
 
 
 if __name__ == "__main__":
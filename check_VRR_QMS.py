@@ -19,30 +19,59 @@ Scan a model.ini and verify:
 Usage:
     python3 check_VRR_QMS.py --model-ini path/to/model.ini [--root ROOT_DIR] \
         [--report kipling.xlsx] [-v]
+    python3 check_VRR_QMS.py --model-ini model/1_a.ini model/2_b.ini --report kipling.xlsx
+    python3 check_VRR_QMS.py --batch-list model_inis.txt --report kipling.xlsx -j 8
 
 Notes:
 - If --report is provided and the file already exists, results are appended.
+- With several --model-ini (or a --batch-list file), the workbook is opened and saved once for all of them
+  (a new report is written in openpyxl write-only mode); add -j/--jobs N to parse the model.ini files
+  in N worker processes (default 1 = no pool; 0 = CPU count).
+- Pipelines running one model.ini per call: add --defer-report so each call only appends
+  to <report>.vrr_rows.csv, then run once with --finalize-report to write the xlsx.
 - Sheet/tab naming follows your convention: derive PID from model filename prefix.
   E.g., "11_WW_TV_..." -> sheet "PID_11". If no numeric prefix is detected -> "others".
 """
 
 import argparse
+import codecs
 import os
 import re
 import sys
 from typing import Dict, List, Optional, Tuple
 
+from _tvconfigs_common import (
+    _normalize_line_breaks,
+    append_sidecar_rows,
+    map_models,
+    read_batch_list,
+    read_sidecar_rows,
+    sidecar_path,
+)
+
+# --defer-report sidecar: <report>.vrr_rows.csv (own file, since this report layout differs
+# from the Rules/Result/condition_1..5 sheets finalized by _tvconfigs_report)
+SIDECAR_KIND = "vrr_rows"
+
 def smart_read_text(path: str, encodings=("utf-8", "utf-16", "latin-1")) -> str:
+    # Read the file once and try each encoding on the same bytes (no reopen / re-read per attempt).
+    # A UTF-16 BOM can never decode as utf-8, so such files go straight to utf-16.
+    with open(path, "rb") as f:
+        data = f.read()
+    if data.startswith((b"\xff\xfe", b"\xfe\xff")) and "utf-16" in encodings:
+        encodings = ("utf-16",) + tuple(e for e in encodings if e != "utf-16")
     last_err = None
     for enc in encodings:
         try:
-            with open(path, "r", encoding=enc) as f:
-                return f.read()
+            # Incremental decoder, as text-mode open() uses (e.g. utf-16 without BOM raises UnicodeError)
+            text = codecs.getincrementaldecoder(enc)().decode(data, final=True)
         except UnicodeDecodeError as e:
             last_err = e
             continue
-        except FileNotFoundError:
-            raise
+        # Same result as text-mode open(): universal newlines
+        if "\r" in text:
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        return text
     if last_err:
         raise last_err
     raise RuntimeError(f"Unable to read file: {path}")
@@ -55,8 +84,22 @@ def parse_bool(s: str) -> Optional[bool]:
         return False
     return None
 
-_ASSIGN_RE = re.compile(r'^\s*([A-Za-z0-9_]+)\s*=\s*"(.*?)"\s*;?\s*$')
-_SECTION_RE = re.compile(r'^\s*\[([^\]]+)\]\s*$')
+# One pass over the whole text instead of a per-line loop. Equivalent to matching each line
+# (after splitlines and '#' / '//' comment removal) against
+#     section: ^\s*\[([^\]]+)\]\s*$
+#     assign : ^\s*([A-Za-z0-9_]+)\s*=\s*"(.*?)"\s*;?\s*$
+# - other str.splitlines() separators are turned into '\n' first; whitespace is [^\S\n] so nothing spans lines
+# - each line is anchored on its leading '\n' (a '\n' is prepended to the text): a literal first char lets
+#   the regex engine jump from line to line instead of trying (?m)^ at every position
+# - greedy (.*)" for the value: only one closing quote can be followed by just blanks / ';' up to
+#   the end of the line, so it picks the same quote as (.*?)" with far less backtracking
+_COMMENT_RE = re.compile(r'#.*|//.*')
+_SECTION_OR_ASSIGN_RE = re.compile(
+    r'\n[^\S\n]*(?:'
+    r'\[(?P<sec>[^\]\n]+)\]'
+    r'|(?P<key>[A-Za-z0-9_]+)[^\S\n]*=[^\S\n]*"(?P<val>.*)"[^\S\n]*;?'
+    r')[^\S\n]*(?=\n|\Z)'
+)
 
 def parse_model_ini_for_edids(text: str) -> Tuple[Dict[str, Optional[bool]], Dict[str, Optional[bool]], List[Dict[str, str]]]:
     """
@@ -72,19 +115,29 @@ def parse_model_ini_for_edids(text: str) -> Tuple[Dict[str, Optional[bool]], Dic
     qms_flag: Optional[bool] = None
     edid_entries: List[Dict[str, str]] = []
 
-    for raw_line in text.splitlines():
-        # remove inline comments starting with '#' or '//' (keep ';' as value terminator)
-        line = raw_line.split('#', 1)[0].split('//', 1)[0]
-
-        sec_m = _SECTION_RE.match(line)
-        if sec_m:
-            current_section = sec_m.group(1).strip()
-            continue
-
-        m = _ASSIGN_RE.match(line)
-        if not m:
+    text = _normalize_line_breaks(text)
+
+    # Short-circuit: only lines mentioning an EDID path ("edid" in val.lower()) or an isSupportVRR /
+    # isSupportQMS key change the result. Past the last such line only section switches remain, so the
+    # text is cut at the end of that line; with none at all there is nothing to parse.
+    # (lower() keeps positions when the length is unchanged; otherwise the whole text is scanned.)
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        last = max(lowered.rfind("edid"), text.rfind("isSupportVRR"), text.rfind("isSupportQMS"))
+        if last < 0:
+            return ({"isSupportVRR": None}, {"isSupportQMS": None}, [])
+        end = text.find("\n", last)
+        if end >= 0:
+            text = text[:end]
+
+    # remove inline comments starting with '#' or '//' (keep ';' as value terminator)
+    text = "\n" + _COMMENT_RE.sub("", text)
+
+    for m in _SECTION_OR_ASSIGN_RE.finditer(text):
+        sec, key, val = m.group("sec", "key", "val")
+        if sec is not None:
+            current_section = sec.strip()
             continue
-        key, val = m.group(1), m.group(2)
 
         # capture SrcFunc flags
         if current_section and current_section.strip().lower() in ("srcfunc", "vrr"):
@@ -134,138 +187,195 @@ def sheet_name_from_model_path(model_path: str) -> str:
         return f"PID_{m.group(1)}"
     return "others"
 
+RULE = "EDID filename tokens must match [SrcFunc] flags"
+
+def _verdict_table(name: str) -> Dict[Tuple[Optional[bool], Optional[bool]], Tuple[bool, str]]:
+    """
+    (isSupport<name> from model.ini, flag implied by the EDID filename) -> (passed, check message),
+    for every True/False/None combination, so build_rows does a lookup instead of a branch cascade.
+    """
+    table: Dict[Tuple[Optional[bool], Optional[bool]], Tuple[bool, str]] = {}
+    for src in (None, True, False):
+        # Check only if filename implies a value
+        table[(src, None)] = (True, f"{name} not implied by filename")
+        for infer in (True, False):
+            if src is None:
+                table[(src, infer)] = (False, f"{name} implied by name ({infer}) but isSupport{name} missing")
+            elif src != infer:
+                table[(src, infer)] = (False, f"{name} implied by name ({infer}) != isSupport{name} ({src})")
+            else:
+                table[(src, infer)] = (True, f"{name} OK: implied {infer} == isSupport{name}")
+    return table
+
+_VRR_VERDICT = _verdict_table("VRR")
+_QMS_VERDICT = _verdict_table("QMS")
+
 def build_rows(model_ini_path: str,
                src_vrr: Optional[bool],
                src_qms: Optional[bool],
                edid_entries: List[Dict[str, str]]) -> List[List[str]]:
+    # Columns that are the same for every EDID item of this model.ini
+    model_col = f"model_ini={model_ini_path}"
+    src_vrr_col = f"isSupportVRR={src_vrr}"
+    src_qms_col = f"isSupportQMS={src_qms}"
+
     rows: List[List[str]] = []
     for e in edid_entries:
         vrr_infer, qms_infer = infer_flags_from_filename(e["filename"])
         # Determine pass/fail per EDID item
-        checks: List[str] = []
-        result = "PASS"
-
-        # VRR check (only if filename implies a value)
-        if vrr_infer is not None:
-            if src_vrr is None:
-                result = "FAIL"
-                checks.append(f"VRR implied by name ({vrr_infer}) but isSupportVRR missing")
-            elif src_vrr != vrr_infer:
-                result = "FAIL"
-                checks.append(f"VRR implied by name ({vrr_infer}) != isSupportVRR ({src_vrr})")
-            else:
-                checks.append(f"VRR OK: implied {vrr_infer} == isSupportVRR")
-        else:
-            checks.append("VRR not implied by filename")
-
-        # QMS check
-        if qms_infer is not None:
-            if src_qms is None:
-                result = "FAIL"
-                checks.append(f"QMS implied by name ({qms_infer}) but isSupportQMS missing")
-            elif src_qms != qms_infer:
-                result = "FAIL"
-                checks.append(f"QMS implied by name ({qms_infer}) != isSupportQMS ({src_qms})")
-            else:
-                checks.append(f"QMS OK: implied {qms_infer} == isSupportQMS")
-        else:
-            checks.append("QMS not implied by filename")
-
-        rule = "EDID filename tokens must match [SrcFunc] flags"
-        row = [
-            rule,
-            result,
-            f"model_ini={model_ini_path}",
+        vrr_ok, vrr_check = _VRR_VERDICT[(src_vrr, vrr_infer)]
+        qms_ok, qms_check = _QMS_VERDICT[(src_qms, qms_infer)]
+        rows.append([
+            RULE,
+            "PASS" if vrr_ok and qms_ok else "FAIL",
+            model_col,
             f"section={e['section']} key={e['key']}",
             f"edid_path={e['value']}",
             f"infer_VRR={vrr_infer}",
-            f"isSupportVRR={src_vrr}",
+            src_vrr_col,
             f"infer_QMS={qms_infer}",
-            f"isSupportQMS={src_qms}",
-        ] + checks
-        rows.append(row)
+            src_qms_col,
+            vrr_check,
+            qms_check,
+        ])
     return rows
 
-def write_or_append_xlsx(xlsx_path: str, sheet: str, rows: List[List[str]]) -> None:
-    from openpyxl import Workbook, load_workbook
-    from openpyxl.styles import Alignment, Font, PatternFill
-    from openpyxl.utils import get_column_letter
-
-    headers = ["Rules", "Result", "condition_1", "condition_2", "condition_3",
-               "condition_4", "condition_5", "condition_6", "condition_7",
-               "condition_8", "condition_9", "condition_10"]
+REPORT_HEADERS = ["Rules", "Result", "condition_1", "condition_2", "condition_3",
+                  "condition_4", "condition_5", "condition_6", "condition_7",
+                  "condition_8", "condition_9", "condition_10"]
 
+def _normalize_rows(rows: List[List[str]]) -> List[List[str]]:
     # Expand rows to match header length (leave extra checks after headers if any)
     norm_rows = []
     for r in rows:
-        base = r[:len(headers)]
-        if len(base) < len(headers):
-            base += [""] * (len(headers) - len(base))
+        base = r[:len(REPORT_HEADERS)]
+        if len(base) < len(REPORT_HEADERS):
+            base += [""] * (len(REPORT_HEADERS) - len(base))
         norm_rows.append(base)
+    return norm_rows
 
-    if os.path.exists(xlsx_path):
-        wb = load_workbook(xlsx_path)
-    else:
-        wb = Workbook()
+def _write_new_xlsx(xlsx_path: str, rows_by_sheet: Dict[str, List[List[str]]]) -> None:
+    """
+    Report file does not exist yet: stream every sheet out with a write-only workbook
+    (no cell objects kept in memory, no load_workbook). Same layout as the append path.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Font
+    from openpyxl.utils import get_column_letter
 
-    ws = wb[sheet] if sheet in wb.sheetnames else wb.create_sheet(title=sheet)
+    bold = Font(bold=True)
+    align = Alignment(wrap_text=True, vertical="top")
+    last_col = get_column_letter(len(REPORT_HEADERS))
+
+    wb = Workbook(write_only=True)
+    for sheet, rows in rows_by_sheet.items():
+        norm_rows = _normalize_rows(rows)
+        ws = wb.create_sheet(title=sheet)
+        for idx in range(1, len(REPORT_HEADERS) + 1):
+            ws.column_dimensions[get_column_letter(idx)].width = 28
+        ws.freeze_panes = "A2"
+        ws.auto_filter.ref = f"A1:{last_col}{len(norm_rows) + 1}"
+
+        header = []
+        for h in REPORT_HEADERS:
+            cell = WriteOnlyCell(ws, value=h)
+            cell.font = bold
+            header.append(cell)
+        ws.append(header)
+        for r in norm_rows:
+            row = []
+            for v in r:
+                cell = WriteOnlyCell(ws, value=v)
+                cell.alignment = align
+                row.append(cell)
+            ws.append(row)
+
+    # Last written sheet is the active one (same as appending sheet by sheet)
+    wb.active = len(rows_by_sheet) - 1
+    wb.save(xlsx_path)
 
-    # If empty sheet, write header
-    if ws.max_row == 1 and all(c.value is None for c in ws[1]):
-        ws.append(headers)
+def write_or_append_xlsx_many(xlsx_path: str, rows_by_sheet: Dict[str, List[List[str]]]) -> None:
+    """
+    Write rows of several sheets with a single open/save of the workbook.
+    A new report is written in write-only mode; an existing one is loaded once,
+    appended to, and only the newly appended rows get the wrap/top alignment.
+    """
+    if not rows_by_sheet:
+        return
+    if not os.path.exists(xlsx_path):
+        _write_new_xlsx(xlsx_path, rows_by_sheet)
+        return
+
+    from openpyxl import load_workbook
+    from openpyxl.styles import Alignment, Font
+    from openpyxl.utils import get_column_letter
+    from _tvconfigs_report import last_row
 
-    for r in norm_rows:
-        ws.append(r)
+    wb = load_workbook(xlsx_path)
+    bold = Font(bold=True)
+    align = Alignment(wrap_text=True, vertical="top")
 
-    # Formatting: bold header, wrap text, vertical top, uniform column width
-    # Bold header
-    for cell in ws[1]:
-        cell.font = Font(bold=True)
+    for sheet, rows in rows_by_sheet.items():
+        norm_rows = _normalize_rows(rows)
+        ws = wb[sheet] if sheet in wb.sheetnames else wb.create_sheet(title=sheet)
 
-    # Wrap & vertical top
-    align = Alignment(wrap_text=True, vertical="top")
-    for row in ws.iter_rows(min_row=2, max_row=ws.max_row):
-        for cell in row:
-            cell.alignment = align
+        # If empty sheet, write header. A sheet just created has no cells at all (last_row == 0);
+        # test that first, since ws[1] creates row-1 cells and would push the header down to row 2
+        if last_row(ws) == 0 or (ws.max_row == 1 and all(c.value is None for c in ws[1])):
+            ws.append(REPORT_HEADERS)
 
-    # Uniform column widths
-    for idx in range(1, len(headers) + 1):
-        ws.column_dimensions[get_column_letter(idx)].width = 28
+        # Wrap & vertical top, only on the rows appended now (earlier rows were styled when written).
+        # Cells are written with ws.cell on the next row (last_row: O(1) via openpyxl's row counter):
+        # ws[row] / ws.iter_rows look up ws.max_column, a scan over every cell of the sheet, per row.
+        # One shared Alignment object; a NamedStyle ("cell.style = ...") measured slower per cell.
+        for r in norm_rows:
+            row = last_row(ws) + 1
+            for col, value in enumerate(r, 1):
+                ws.cell(row=row, column=col, value=value).alignment = align
 
-    # Freeze header row and add auto-filter (to match your preferred report UX)
-    ws.freeze_panes = "A2"
-    ws.auto_filter.ref = f"A1:{get_column_letter(len(headers))}{ws.max_row}"
+        # Bold header
+        for cell in ws[1]:
+            cell.font = bold
 
-    # Set active sheet to this one
-    wb.active = wb.index(ws)
+        # Uniform column widths
+        for idx in range(1, len(REPORT_HEADERS) + 1):
+            ws.column_dimensions[get_column_letter(idx)].width = 28
 
-    wb.save(xlsx_path)
+        # Freeze header row and add auto-filter (to match your preferred report UX)
+        ws.freeze_panes = "A2"
+        ws.auto_filter.ref = f"A1:{get_column_letter(len(REPORT_HEADERS))}{ws.max_row}"
 
-def main():
-    ap = argparse.ArgumentParser(description="Check EDID filename vs isSupportVRR/QMS flags in model.ini")
-    ap.add_argument("--model-ini", required=True, help="Path to model.ini")
-    ap.add_argument("--root", default=".", help="Root dir to resolve relative paths (unused for now, kept for consistency)")
-    ap.add_argument("--report", help="If set, append results to this Excel file")
-    # Backward compatibility with older param name, if any scripts still pass it.
-    ap.add_argument("--report-xlsx", help=argparse.SUPPRESS)
-    ap.add_argument("-v", "--verbose", action="store_true", help="Verbose logging")
-    args = ap.parse_args()
+        # Set active sheet to this one
+        wb.active = wb.index(ws)
 
-    # Normalize report path: prefer --report, fallback to --report-xlsx
-    report_path = args.report or args.report_xlsx
+    wb.save(xlsx_path)
 
-    model_path = args.model_ini
-    try:
-        text = smart_read_text(model_path)
-    except Exception as e:
-        print(f"[ERROR] Cannot read model.ini: {model_path}: {e}", file=sys.stderr)
-        sys.exit(2)
+def write_or_append_xlsx(xlsx_path: str, sheet: str, rows: List[List[str]]) -> None:
+    write_or_append_xlsx_many(xlsx_path, {sheet: rows})
+
+def finalize_report(xlsx_path: str) -> List[str]:
+    """
+    Write the rows collected by --defer-report (<xlsx>.vrr_rows.csv) into xlsx_path with one
+    write_or_append_xlsx_many call, then remove the CSV. Returns the sheet names written.
+    """
+    sidecar = read_sidecar_rows(xlsx_path, SIDECAR_KIND)
+    if sidecar is None:
+        return []
+    rows_by_sheet, _ = sidecar
+    write_or_append_xlsx_many(xlsx_path, rows_by_sheet)
+    os.remove(sidecar_path(xlsx_path, SIDECAR_KIND))
+    return list(rows_by_sheet)
+
+def check_model(model_path: str, verbose: bool = False) -> List[List[str]]:
+    """Parse one model.ini, print the console summary and return its report rows."""
+    text = smart_read_text(model_path)
 
     src_vrr_dict, src_qms_dict, edids = parse_model_ini_for_edids(text)
     src_vrr = src_vrr_dict["isSupportVRR"]
     src_qms = src_qms_dict["isSupportQMS"]
 
-    if args.verbose:
+    if verbose:
         print(f"[INFO] Parsed [SrcFunc]: isSupportVRR={src_vrr}, isSupportQMS={src_qms}")
         print(f"[INFO] Found {len(edids)} EDID .bin entries")
 
@@ -280,16 +390,86 @@ def main():
     print(f"EDID bins : {total} (PASS={passes}, FAIL={fails})")
     for r in rows:
         print(f"- [{r[1]}] {r[0]} | {r[3]} | {r[4]} | {r[5]} {r[6]} | {r[7]} {r[8]}")
+    return rows
+
+def _check_model_or_error(model_path: str, verbose: bool) -> Tuple[Optional[List[List[str]]], str]:
+    """check_model for map_models workers: a read error is returned (rows None) instead of raised."""
+    try:
+        return check_model(model_path, verbose), ""
+    except Exception as e:
+        return None, str(e)
+
+def _finalize(report_path: str) -> None:
+    try:
+        sheets = finalize_report(report_path)
+    except Exception as e:
+        print(f"[ERROR] Failed to write report: {e}", file=sys.stderr)
+        sys.exit(3)
+    print(f"[INFO] Deferred rows written to: {report_path} (sheets: {', '.join(sheets) if sheets else 'none'})")
+
+def main():
+    ap = argparse.ArgumentParser(description="Check EDID filename vs isSupportVRR/QMS flags in model.ini")
+    ap.add_argument("--model-ini", nargs="+",
+                    help="Path to model.ini (several may be given; the report is then written once)")
+    ap.add_argument("--batch-list", metavar="FILE",
+                    help="File listing model.ini paths (one per line), checked together with any --model-ini")
+    ap.add_argument("--root", default=".", help="Root dir to resolve relative paths (unused for now, kept for consistency)")
+    ap.add_argument("--report", help="If set, append results to this Excel file")
+    # Backward compatibility with older param name, if any scripts still pass it.
+    ap.add_argument("--report-xlsx", help=argparse.SUPPRESS)
+    ap.add_argument("-v", "--verbose", action="store_true", help="Verbose logging")
+    ap.add_argument("-j", "--jobs", type=int, default=1,
+                    help="Worker processes for several model.ini (default: 1 = no pool; 0 = CPU count)")
+    ap.add_argument("--defer-report", action="store_true",
+                    help="Pipeline mode: only append rows to <report>.vrr_rows.csv, do not open the xlsx")
+    ap.add_argument("--finalize-report", action="store_true",
+                    help="Write rows collected by --defer-report into the report in one go (may be used alone)")
+    args = ap.parse_args()
+
+    # Normalize report path: prefer --report, fallback to --report-xlsx
+    report_path = args.report or args.report_xlsx
+    if (args.defer_report or args.finalize_report) and not report_path:
+        ap.error("--defer-report/--finalize-report need --report FILE")
+    model_inis = list(args.model_ini or [])
+    if args.batch_list:
+        model_inis += read_batch_list(args.batch_list)
+    if not model_inis:
+        if not args.finalize_report:
+            ap.error("one of --model-ini / --batch-list is required")
+        _finalize(report_path)
+        return
+
+    # Rows of every model.ini, grouped per sheet, written with one workbook open/save.
+    # Models are parsed in a process pool; console output is printed here in input order.
+    rows_by_sheet: Dict[str, List[List[str]]] = {}
+    read_failed = False
+    results = map_models(_check_model_or_error, model_inis, args.verbose, max_workers=args.jobs)
+    for model_path, ((rows, error), out) in zip(model_inis, results):
+        print(out, end="")
+        if rows is None:
+            print(f"[ERROR] Cannot read model.ini: {model_path}: {error}", file=sys.stderr)
+            read_failed = True
+            continue
+        rows_by_sheet.setdefault(sheet_name_from_model_path(model_path), []).extend(rows)
 
     # Excel report
-    if report_path:
-        sheet = sheet_name_from_model_path(model_path)
+    if report_path and rows_by_sheet and args.defer_report:
+        for sheet, rows in rows_by_sheet.items():
+            append_sidecar_rows(_normalize_rows(rows), sheet, report_path, kind=SIDECAR_KIND)
+        print(f"[INFO] Report rows deferred to: {sidecar_path(report_path, SIDECAR_KIND)} (sheet: {', '.join(rows_by_sheet)})")
+    elif report_path and rows_by_sheet:
         try:
-            write_or_append_xlsx(report_path, sheet, rows)
-            print(f"[INFO] Report written to: {report_path} (sheet: {sheet})")
+            write_or_append_xlsx_many(report_path, rows_by_sheet)
+            print(f"[INFO] Report written to: {report_path} (sheet: {', '.join(rows_by_sheet)})")
         except Exception as e:
             print(f"[ERROR] Failed to write report: {e}", file=sys.stderr)
             sys.exit(3)
 
+    if args.finalize_report:
+        _finalize(report_path)
+
+    if read_failed:
+        sys.exit(2)
+
 if __name__ == "__main__":
     main()
@@ -21,64 +21,136 @@ Usage:
   python3 check_allm_flag.py --model-ini model/1_xxx.ini --root . --report
   python3 check_allm_flag.py --model-ini model/1_xxx.ini --root . --report-xlsx kipling.xlsx
   python3 check_allm_flag.py --model-ini model/1_xxx.ini --root . -v
+  python3 check_allm_flag.py --batch-list model_inis.txt --root . --report-xlsx kipling.xlsx
+
+Pipelines running one model.ini per call: add --defer-report so each call only appends to
+<report>.allm_pid12_rows.csv, then run once with --finalize-report to write the xlsx.
 """
 
 import argparse
 import os
 import re
+import sys
+from functools import lru_cache
 from typing import Optional, Dict, List, Tuple
 
+# _read_text: utf-8 -> latin-1 -> utf-16, cached by (path, mtime_ns, size). Raises FileNotFoundError if missing.
+from _tvconfigs_common import (
+    _normalize_line_breaks,
+    _read_text,
+    append_sidecar_rows,
+    read_batch_list,
+    read_sidecar_rows,
+    sidecar_path,
+)
+
+# --defer-report sidecar: <report>.allm_pid12_rows.csv (own file: this 4-column layout and its cell
+# colours differ from the Rules/Result/condition_1..5 rows finalized by _tvconfigs_report)
+SIDECAR_KIND = "allm_pid12_rows"
+
 
 # -----------------------------
 # File reading & parsing helpers
 # -----------------------------
 
-def _read_text(path: str) -> str:
-    """Read text with common encodings. Raises FileNotFoundError if missing."""
-    for enc in ("utf-8", "latin-1", "utf-16"):
-        try:
-            with open(path, "r", encoding=enc) as f:
-                return f.read()
-        except UnicodeDecodeError:
-            continue
-        except FileNotFoundError:
-            raise
-    with open(path, "r") as f:
-        return f.read()
-
-
 def _strip_comment(line: str) -> str:
     """Remove comments starting with '#' or ';' and trim whitespace."""
-    line = line.split("#", 1)[0]
-    line = line.split(";", 1)[0]
+    # Most lines carry no comment: test with `in` before cutting
+    if "#" in line or ";" in line:
+        return line.partition("#")[0].partition(";")[0].strip()
     return line.strip()
 
 
-def _find_kv_case_insensitive(text: str, key: str) -> Optional[str]:
+# [Section] header line
+_SECTION_RE = re.compile(r'^\s*\[([^\]]+)\]\s*$')
+
+# Whole-text forms of the same header line, for text with other str.splitlines() breaks turned into '\n'
+# and a '\n' added at both ends: each line begins at its '\n', whitespace is [^\S\n] so nothing spans lines.
+# A literal first character lets the regex engine skip straight from line to line.
+_HEADER_RE = re.compile(r'\n[^\S\n]*\[[^\]\n]+\][^\S\n]*(?=\n)')
+_ALLM_HEADER_RE = re.compile(r'\n[^\S\n]*\[[^\S\n]*allm[^\S\n]*\][^\S\n]*(?=\n)', re.IGNORECASE)
+
+
+@lru_cache(maxsize=64)
+def _compiled_many_kv(keys: Tuple[str, ...]) -> "re.Pattern[str]":
     """
-    Return the unquoted value for the first un-commented line like: key = value
-    Case-insensitive key matching. Returns None if not found.
+    Compiled `key = value` matcher for several keys at once (case-insensitive), built once per key tuple.
+    Group i+1 is set when keys[i] matched; the unquoted value is group 'v'.
     """
+    alts = "|".join(f"({re.escape(k)})" for k in keys)
+    return re.compile(r'^\s*(?:' + alts + r')\s*=\s*(?P<q>"?)(?P<v>.*?)(?P=q)\s*$', re.IGNORECASE)
+
+
+def _find_many_kv(text: str, keys: Tuple[str, ...]) -> Dict[str, str]:
+    """
+    Same rules as _find_kv_case_insensitive for several keys in a single pass over the lines.
+    Returns {key: value} for the first un-commented assignment of each key; keys not found are absent.
+    Stops as soon as every key has been found.
+    """
+    by_lower = {k.lower(): k for k in keys}
+    found: Dict[str, str] = {}
     for raw in text.splitlines():
         line = _strip_comment(raw)
-        if not line or "=" not in line:
+        if "=" not in line:
             continue
-        m = re.match(r'^\s*' + re.escape(key) + r'\s*=\s*("?)(.*?)\1\s*$', line, re.IGNORECASE)
-        if m:
-            return m.group(2).strip()
-    return None
+        name, _, value = line.partition("=")
+        name = name.strip()
+        if name.isascii():
+            key = by_lower.get(name.lower())
+            if key is None or key in found:
+                continue
+            value = value.strip()
+            if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+                value = value[1:-1]
+            found[key] = value.strip()
+        else:
+            # re.IGNORECASE also folds non-ASCII look-alikes ('ſ', 'ı', Kelvin sign): let the regex decide
+            m = _compiled_many_kv(keys).match(line)
+            if not m:
+                continue
+            key = next(k for i, k in enumerate(keys, 1) if m.group(i) is not None)
+            if key in found:
+                continue
+            found[key] = m.group("v").strip()
+        if len(found) == len(keys):
+            break
+    return found
+
+
+def _find_kv_case_insensitive(text: str, key: str) -> Optional[str]:
+    """
+    Return the unquoted value for the first un-commented line like: key = value
+    Case-insensitive key matching. Returns None if not found.
+    """
+    return _find_many_kv(text, (key,)).get(key)
+
+
+# Everything the checks need from model.ini, collected by one scan
+_MODEL_INI_KEYS = ("isSupportALLM", "TvDefaultSettingsPath")
+
+
+@lru_cache(maxsize=128)
+def _parse_model_ini_cached(path: str, mtime_ns: int, size: int) -> Dict[str, str]:
+    return _find_many_kv(_read_text(path), _MODEL_INI_KEYS)
+
+
+def parse_model_ini(model_ini_path: str) -> Dict[str, str]:
+    """
+    {key: value} for _MODEL_INI_KEYS found in model.ini (missing keys are absent).
+    Cached by (path, mtime_ns, size): both checks share a single scan. Raises FileNotFoundError if missing.
+    """
+    st = os.stat(model_ini_path)
+    return _parse_model_ini_cached(model_ini_path, st.st_mtime_ns, st.st_size)
 
 
 def _find_is_support_allm(model_ini_path: str) -> Optional[str]:
     """Find the (uncommented) value of isSupportALLM in model.ini."""
-    text = _read_text(model_ini_path)
-    return _find_kv_case_insensitive(text, "isSupportALLM")
+    return parse_model_ini(model_ini_path).get("isSupportALLM")
 
 
 def _find_tv_default_settings_path(model_ini_path: str) -> Optional[str]:
     """Find TvDefaultSettingsPath in model.ini (case-insensitive)."""
-    text = _read_text(model_ini_path)
-    return _find_kv_case_insensitive(text, "TvDefaultSettingsPath")
+    return parse_model_ini(model_ini_path).get("TvDefaultSettingsPath")
 
 
 def _map_tvconfigs_to_root(tvconfigs_path: str, root: str) -> str:
@@ -141,24 +213,25 @@ def _extract_allm_section_lines(text: str) -> List[str]:
     Return raw (uncommented) lines inside [ALLM] section until next [Section].
     Empty/comment-only lines are skipped.
     """
-    lines = text.splitlines()
-    in_section = False
+    # Locate [ALLM] headers and the next header with two regex searches over the whole text
+    # (every line starts with '\n', see _ALLM_HEADER_RE); only the section body is split into lines
+    text = "\n" + _normalize_line_breaks(text) + "\n"
     result: List[str] = []
-    for raw in lines:
-        stripped = raw.strip()
-        if re.match(r'^\s*\[([^\]]+)\]\s*$', stripped):
-            sect = re.findall(r'^\s*\[([^\]]+)\]\s*$', stripped)[0]
-            in_section = (sect.strip().lower() == "allm")
-            continue
-        if in_section:
+    pos = 0
+    while True:
+        head = _ALLM_HEADER_RE.search(text, pos)
+        if head is None:
+            return result
+        nxt = _HEADER_RE.search(text, head.end())
+        pos = nxt.start() if nxt else len(text)
+        for raw in text[head.end():pos].split("\n"):
             line = _strip_comment(raw)
             if not line:
                 continue
             # Stop if it looks like a new section header (defensive)
-            if re.match(r'^\s*\[([^\]]+)\]\s*$', line):
-                break
+            if line[:1] == "[" and _SECTION_RE.match(line):
+                return result
             result.append(line)
-    return result
 
 
 def check_tvdefault_allm_enable(model_ini_path: str, root: str) -> Dict[str, object]:
@@ -202,17 +275,23 @@ def check_tvdefault_allm_enable(model_ini_path: str, root: str) -> Dict[str, obj
             "notes": ["找不到 [ALLM] 區塊或是區塊內沒有有效內容"]
         }
 
-    # Identify ENABLE-like assignments in the section
-    enable_pairs: List[Tuple[str, str]] = []
-    pairs = {}
+    # Identify ENABLE-like assignments in the section: "KEY=VALUE[,KEY=VALUE...]" per line.
+    # Pairs without '=' are malformed and skipped (they used to abort the whole check with a ValueError).
+    found_pairs = False
+    offending: List[str] = []
     for line in lines:
         for pair in line.split(','):
-            key, value = pair.split('=')
-            pairs[key] = value
-            enable_pairs.append((key,value))
-
-    #print(enable_pairs)
-    if not enable_pairs:
+            key, eq, val = pair.partition('=')
+            if not eq:
+                continue
+            found_pairs = True
+            key = key.strip()
+            val = val.strip()
+            # Accept "1" (string) as pass; anything else is fail
+            if val != "1" and key.lower() == "enable":
+                offending.append(f"{key}={val}")
+
+    if not found_pairs:
         return {
             "passed": False,
             "path": actual,
@@ -220,12 +299,6 @@ def check_tvdefault_allm_enable(model_ini_path: str, root: str) -> Dict[str, obj
             "notes": ["[ALLM] 區塊內沒有找到任何 ENABLE 相關設定"]
         }
 
-    offending: List[str] = []
-    for key, val in enable_pairs:
-        # Accept "1" (string) as pass; anything else is fail
-        if val != "1" and key.lower() == "enable":
-            offending.append(f"{key}={val}")
-
     #print(offending)
     passed = (len(offending) == 0)
     if not passed:
@@ -238,38 +311,12 @@ def check_tvdefault_allm_enable(model_ini_path: str, root: str) -> Dict[str, obj
 # XLSX report
 # -----------------------------
 
-def export_report(res1: Dict[str, object], res2: Dict[str, object], xlsx_path: str, sheet_name: str = "ALLM") -> None:
+def _report_row(res1: Dict[str, object], res2: Dict[str, object]) -> List[str]:
     """
-    Export report with columns: Rules, Result, condition_1, condition_2
+    Row values: Rules, Result, condition_1, condition_2
     - condition_1: isSupportALLM = <value or N/A>
     - condition_2: TvDefaultSettingsPath [ALLM] ENABLE=1 check summary
-    - Uniform column width, wrap text, vertical top; bold header
     """
-    try:
-        from openpyxl import Workbook, load_workbook
-        from openpyxl.styles import Alignment, Font, PatternFill
-        from openpyxl.utils import get_column_letter
-    except ImportError as e:
-        raise SystemExit(
-            "[ERROR] 需要 openpyxl 才能輸出報表。\n"
-            "  安裝： pip install --user openpyxl\n"
-        ) from e
-
-    COMMON_WIDTH = 80
-    ALIGN = Alignment(wrap_text=True, vertical="top")
-    BOLD = Font(bold=True)
-
-    try:
-        wb = load_workbook(xlsx_path)
-    except Exception:
-        wb = Workbook()
-
-    if sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-    else:
-        ws = wb.create_sheet(title=sheet_name)
-        ws.append(["Rules", "Result", "condition_1", "condition_2"])
-
     # Compose fields
     rules = (
         "5. ALLM 要打開\n" \
@@ -297,87 +344,177 @@ def export_report(res1: Dict[str, object], res2: Dict[str, object], xlsx_path: s
         #cond2 = f"[ALLM] ENABLE 檢查: FAIL\nPath: {path2}\n{detail}".rstrip()
         cond2 = f"[ALLM] ENABLE 檢查: FAIL\n{detail}".rstrip()
 
-    ws.append([rules, result, cond1, cond2])
-    last_row = ws.max_row
-
-    # 給儲存格指派上色
-    rules_color = PatternFill(start_color="DAEEF3", end_color="DAEEF3", fill_type="solid")
-    failed_color = PatternFill(start_color="FDE9D9", end_color="FDE9D9", fill_type="solid")
-    # 上色
-    first_cell = ws.cell(row=last_row, column=1)  # 欄位1對應的是 'A' 列
-    first_cell.fill = rules_color
-    if result == "FAIL":
-        ws.cell(row=last_row, column=2).fill = failed_color
-    if cond1 == "isSupportALLM = N/A":
-        ws.cell(row=last_row, column=3).fill = failed_color
-    if not res2['passed']:
-        ws.cell(row=last_row, column=4).fill = failed_color
-
-    # Formatting
-    for col in range(1, 4 + 1):
-        ws.column_dimensions[get_column_letter(col)].width = COMMON_WIDTH
-    for cell in ws[1]:
-        cell.font = BOLD
-        cell.alignment = ALIGN
-    for cell in ws[last_row]:
-        cell.alignment = ALIGN
-
-    # Remove default "Sheet" if exists
-    if "Sheet" in wb.sheetnames and len(wb.sheetnames) > 1:
-        try:
-            wb.remove(wb["Sheet"])
-        except Exception:
-            pass
-
-    wb.save(xlsx_path)
+    return [rules, result, cond1, cond2]
+
+
+def _report_sheet(wb, sheet_name: str):
+    """Worksheet sheet_name of wb; created with the header row if missing."""
+    from _tvconfigs_report import put_row
+
+    if sheet_name in wb.sheetnames:
+        return wb[sheet_name]
+    ws = wb.create_sheet(title=sheet_name)
+    put_row(ws, ["Rules", "Result", "condition_1", "condition_2"], align_cols=0)
+    return ws
+
+
+def _put_report_row(ws, values: List[str]) -> None:
+    """Append one row right after the last one (no ws.max_row scan); wrap text + vertical top."""
+    from _tvconfigs_report import FAIL_FILL, RULES_FILL, put_row
+
+    cells = put_row(ws, values)
+
+    # 上色（RULES_FILL 淺藍、FAIL_FILL 淺紅，與其他檢查共用）；只看列的內容，sidecar 讀回的列也能套同樣的顏色
+    cells[0].fill = RULES_FILL  # 欄位1對應的是 'A' 列
+    if values[1] == "FAIL":
+        cells[1].fill = FAIL_FILL
+    if values[2] == "isSupportALLM = N/A":
+        cells[2].fill = FAIL_FILL
+    if values[3] != "[ALLM] ENABLE 檢查: PASS":
+        cells[3].fill = FAIL_FILL
+
+
+def export_report(res1: Dict[str, object], res2: Dict[str, object], xlsx_path: str, sheet_name: str = "ALLM",
+                  save: bool = True, defer: bool = False) -> None:
+    """
+    Export report with columns: Rules, Result, condition_1, condition_2 (see _report_row)
+    - Uniform column width, wrap text, vertical top; bold header
+    - save=False: only append to the workbook cached by _tvconfigs_report.get_workbook;
+      the caller saves once with save_workbook(xlsx_path) (--batch-list)
+    - defer=True: only append the row to <xlsx_path>.allm_pid12_rows.csv (no openpyxl, xlsx untouched);
+      finalize_report writes all collected rows later (--defer-report / --finalize-report)
+    """
+    values = _report_row(res1, res2)
+    if defer:
+        append_sidecar_rows([values], sheet_name, xlsx_path, kind=SIDECAR_KIND)
+        return
+
+    # Shared report helpers (openpyxl is only imported here, when a report is requested)
+    from _tvconfigs_report import get_workbook, save_workbook, style_sheet
+
+    # Open existing xlsx or create a new one (a workbook already loaded in this process is reused)
+    ws = _report_sheet(get_workbook(xlsx_path), sheet_name)
+    _put_report_row(ws, values)
+
+    # Formatting: uniform column width, bold header (set once per sheet)
+    style_sheet(ws, 4)
+
+    # Save now (other checks may write the same xlsx next); default "Sheet" is removed on save
+    if save:
+        save_workbook(xlsx_path)
+
+
+def finalize_report(xlsx_path: str) -> List[str]:
+    """
+    Write the rows collected by --defer-report (<xlsx_path>.allm_pid12_rows.csv) into xlsx_path
+    with a single load/save, then remove the CSV. Returns the sheet names written.
+    """
+    sidecar = read_sidecar_rows(xlsx_path, SIDECAR_KIND)
+    if sidecar is None:
+        return []
+    rows_by_sheet, _ = sidecar
+
+    from _tvconfigs_report import get_workbook, save_workbook, style_sheet
+
+    wb = get_workbook(xlsx_path)
+    for sheet_name, rows in rows_by_sheet.items():
+        ws = _report_sheet(wb, sheet_name)
+        for values in rows:
+            _put_report_row(ws, values)
+        style_sheet(ws, 4)
+    save_workbook(xlsx_path)
+    os.remove(sidecar_path(xlsx_path, SIDECAR_KIND))
+    return list(rows_by_sheet)
 
 
 # -----------------------------
 # CLI
 # -----------------------------
 
-def main():
-    ap = argparse.ArgumentParser(
-        description="Check model.ini:isSupportALLM == true AND TvDefaultSettingsPath [ALLM] ENABLE* = 1."
-    )
-    ap.add_argument("--model-ini", required=True, help="Path to model.ini")
-    ap.add_argument("--root", default=".", help="Root dir for mapping /tvconfigs/... => <root>/... (default: current dir)")
-    ap.add_argument("--report", action="store_true", help="Append result to kipling.xlsx")
-    ap.add_argument("--report-xlsx", metavar="FILE", help="Append result to a specific XLSX file")
-    ap.add_argument("-v", "--verbose", action="store_true", help="Verbose output")
-    args = ap.parse_args()
-
-    if not os.path.exists(args.model_ini):
-        raise SystemExit(f"[ERROR] model ini not found: {args.model_ini}")
-    root_abs = os.path.abspath(args.root)
-
-    # Run checks
-    res1 = check_is_support_allm(args.model_ini)
-    res2 = check_tvdefault_allm_enable(args.model_ini, root_abs)
+def _check_one(model_ini: str, root_abs: str, verbose: bool) -> Tuple[Dict[str, object], Dict[str, object]]:
+    """Run both checks on one model.ini and print the console output."""
+    res1 = check_is_support_allm(model_ini)
+    res2 = check_tvdefault_allm_enable(model_ini, root_abs)
 
     # Console output
     print(f"[CHECK-1] isSupportALLM = {res1['value'] or 'N/A'} -> {'PASS' if res1['passed'] else 'FAIL'}")
-    if args.verbose and res1.get('notes'):
+    if verbose and res1.get('notes'):
         for n in res1['notes']:
             print("  -", n)
 
     tvdef_path = res2.get("path") or "N/A"
     print(f"[CHECK-2] TvDefaultSettingsPath [ALLM] ENABLE 檢查 on: {tvdef_path} -> {'PASS' if res2['passed'] else 'FAIL'}")
-    if args.verbose:
+    if verbose:
         if res2.get("offending"):
             print("  Offending ENABLE lines:")
             for o in res2["offending"]:
                 print("   *", o)
         for n in res2.get("notes", []):
             print("  -", n)
+    return res1, res2
+
+
+def _finalize(xlsx_path: str) -> None:
+    sheets = finalize_report(xlsx_path)
+    print(f"[INFO] Deferred rows written to: {xlsx_path} (sheets: {', '.join(sheets) if sheets else 'none'})")
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Check model.ini:isSupportALLM == true AND TvDefaultSettingsPath [ALLM] ENABLE* = 1."
+    )
+    ap.add_argument("--model-ini", help="Path to model.ini")
+    ap.add_argument("--batch-list", metavar="FILE",
+                    help="File listing model.ini paths (one per line); all are checked in one run and the report is saved once")
+    ap.add_argument("--root", default=".", help="Root dir for mapping /tvconfigs/... => <root>/... (default: current dir)")
+    ap.add_argument("--report", action="store_true", help="Append result to kipling.xlsx")
+    ap.add_argument("--report-xlsx", metavar="FILE", help="Append result to a specific XLSX file")
+    ap.add_argument("-v", "--verbose", action="store_true", help="Verbose output")
+    ap.add_argument("--defer-report", action="store_true",
+                    help="Pipeline mode: append the row to <xlsx>.allm_pid12_rows.csv instead of opening the xlsx")
+    ap.add_argument("--finalize-report", action="store_true",
+                    help="Write rows collected by --defer-report into the xlsx in one go (may be used alone)")
+    args = ap.parse_args()
+
+    model_inis = [args.model_ini] if args.model_ini else []
+    if args.batch_list:
+        model_inis += read_batch_list(args.batch_list)
+    if not model_inis:
+        if not args.finalize_report:
+            ap.error("one of --model-ini / --batch-list is required")
+        _finalize(args.report_xlsx or "kipling.xlsx")
+        return
+    root_abs = os.path.abspath(args.root)
+    want_report = args.report_xlsx or args.report or args.defer_report or args.finalize_report
+    xlsx_path = (args.report_xlsx or "kipling.xlsx") if want_report else None
+    batch = len(model_inis) > 1
+
+    missing = False
+    for model_ini in model_inis:
+        if not os.path.exists(model_ini):
+            if not batch:
+                raise SystemExit(f"[ERROR] model ini not found: {model_ini}")
+            print(f"[ERROR] model ini not found: {model_ini}", file=sys.stderr)
+            missing = True
+            continue
 
-    # Report
-    if args.report_xlsx:
-        export_report(res1, res2, args.report_xlsx, sheet_name=infer_pid_sheet_name(args.model_ini))
-        print(f"[INFO] Report appended to: {args.report_xlsx} (sheet: {infer_pid_sheet_name(args.model_ini)})")
-    elif args.report:
-        export_report(res1, res2, "kipling.xlsx", sheet_name=infer_pid_sheet_name(args.model_ini))
-        print(f"[INFO] Report appended to: kipling.xlsx (sheet: {infer_pid_sheet_name(args.model_ini)})")
+        # Run checks
+        res1, res2 = _check_one(model_ini, root_abs, args.verbose)
+
+        # Report (batch: rows go to the workbook kept in memory, saved once below;
+        # --defer-report: rows only go to the CSV sidecar)
+        if xlsx_path:
+            sheet = infer_pid_sheet_name(model_ini)
+            export_report(res1, res2, xlsx_path, sheet_name=sheet, save=not batch, defer=args.defer_report)
+            print(f"[INFO] Report appended to: {xlsx_path} (sheet: {sheet}){' [deferred]' if args.defer_report else ''}")
+
+    if xlsx_path and batch and not args.defer_report:
+        from _tvconfigs_report import save_workbook
+        save_workbook(xlsx_path)
+    if args.finalize_report:
+        _finalize(xlsx_path)
+    if missing:
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":
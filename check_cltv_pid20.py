@@ -13,141 +13,97 @@ check_cltv.py
   - 表頭粗體、所有欄位同寬、換行、垂直靠上（含表頭與資料列）
   - Result 僅輸出 PASS / FAIL / N/A（不含 "Result = " 前綴）
   - 不輸出 Model.ini 欄位（如需可自行在 conditions 中加入）
+
+批次：--batch-list FILE（一行一個 model.ini）在同一行程內檢查全部，報表 workbook 只載入/存檔一次
 """
 import argparse
 import os
 import re
-from typing import Optional
+import sys
+from typing import Any, List, Optional
+
+from _tvconfigs_common import _na, _sheet_name_for_model, read_batch_list
+
+# LaunchCLTVByCountry = "<path>"（容忍未加引號）；模組載入時編譯一次，逐行比對不再經過 re 模組的 pattern 快取查找
+_LAUNCH_CLTV_RE = re.compile(r'LaunchCLTVByCountry\s*=\s*"([^"]*)"')
+_LAUNCH_CLTV_BARE_RE = re.compile(r'LaunchCLTVByCountry\s*=\s*(\S+)')
+
 
 # -----------------------------
 # Utilities for report
 # -----------------------------
-def _sheet_name_for_model(model_ini_path: str) -> str:
-    import os, re
-    base = os.path.basename(model_ini_path or "")
-    m = re.match(r"^(\d+)_", base)
-    if m:
-        return f"PID_{int(m.group(1))}"
-    return "others"
-
-
-def _ensure_openpyxl():
-    try:
-        import openpyxl  # noqa
-    except ImportError:
-        raise SystemExit(
-            "[ERROR] 需要 openpyxl 以支援報表輸出與附加。\n"
-            "  安裝： pip install --user openpyxl\n"
-        )
-
-
-def export_report(res: dict, xlsx_path: str = "kipling.xlsx", num_condition_cols: int = 5) -> None:
+def _report_row(res: dict) -> List[str]:
+    """res → 一列報表值：Rules, Result, condition_*（欄位無值時以 'N/A' 填入）"""
+    rules      = _na(res.get("rules", ""))
+    result     = _na(res.get("result", ""))
+    conditions = [ _na(x) for x in (res.get("conditions", []) or []) ]
+    return [rules, result] + conditions
+
+
+def _paint_row(cells: List[Any], values: List[str]) -> None:
+    """上色（就地附加與 write-only 新檔共用）：Rules 欄淺藍；Result 為 FAIL 及 condition 判定異常的欄位淺紅"""
+    from _tvconfigs_report import FAIL_FILL, RULES_FILL
+
+    cells[0].fill = RULES_FILL  # 欄位1對應的是 'A' 列
+    if values[1] == "FAIL":
+        cells[1].fill = FAIL_FILL
+    if values[3] != "File Exists = N/A":
+        cells[3].fill = FAIL_FILL
+    if values[2] != "LaunchCLTVByCountry = N/A":
+        cells[2].fill = FAIL_FILL
+
+
+def export_report(res: dict, xlsx_path: str = "kipling.xlsx", num_condition_cols: int = 5, save: bool = True) -> None:
     """
     表頭固定為: Rules, Result, condition_1, condition_2, condition_3, ...
     欄位無值時以 'N/A' 填入。依 model.ini 檔名前綴分頁（PID_1、PID_2…；非數字→others），既有資料則附加。
     全欄統一樣式：同寬、換行、垂直置頂（包含表頭）。
+    save=False：只附加到 _tvconfigs_report.get_workbook 快取的 workbook，由呼叫端最後 save_workbook(xlsx_path) 一次存檔。
     """
-    _ensure_openpyxl()
-    from openpyxl import Workbook, load_workbook
-    from openpyxl.styles import Alignment, Font, PatternFill
-    from openpyxl.utils import get_column_letter
-
-    COMMON_WIDTH = 80
-    COMMON_ALIGN = Alignment(wrap_text=True, vertical="top")
-    BOLD = Font(bold=True)
-
-    def _na(s: str) -> str:
-        s = (s or "").strip()
-        return s if s else "N/A"
+    # 共用報表模組（openpyxl 缺少時由它提示安裝方式）；樣式物件為模組層級共用，不每次呼叫重建
+    from _tvconfigs_report import (
+        get_workbook, put_row, report_exists, save_workbook, style_sheet, write_report_batch,
+    )
 
     sheet_name = _sheet_name_for_model(res.get("model_ini", ""))
+    row_values = _report_row(res)
+    total_cols = 2 + num_condition_cols
 
-    # 開啟或新建 xlsx
-    try:
-        wb = load_workbook(xlsx_path)
-    except Exception:
-        wb = Workbook()
+    # 報表還不存在：write-only 串流寫出（表頭 + 這一列），不建立一般 Workbook 的儲存格物件；
+    # 樣式與就地附加相同（欄寬、表頭粗體、第 1..total_cols 欄換行置頂、上色）
+    if save and not report_exists(xlsx_path):
+        write_report_batch({sheet_name: [row_values]}, xlsx_path, num_condition_cols,
+                           paint=_paint_row, align_cols=total_cols)
+        return
+
+    # 開啟或新建 xlsx（本行程已載入過的 workbook 直接沿用，不再每次 load_workbook）
+    wb = get_workbook(xlsx_path)
 
     # 建立或取得 sheet（表頭固定順序）
     header = ["Rules", "Result"] + [f"condition_{i}" for i in range(1, num_condition_cols + 1)]
     if sheet_name in wb.sheetnames:
         ws = wb[sheet_name]
-        if ws.max_row < 1:
-            ws.append(header)
     else:
         ws = wb.create_sheet(title=sheet_name)
-        ws.append(header)
-
-    # 取值
-    rules      = _na(res.get("rules", ""))
-    result     = _na(res.get("result", ""))
-    conditions = [ _na(x) for x in (res.get("conditions", []) or []) ]
-    """
-    # 補足 condition_* 欄位數
-    if len(conditions) < num_condition_cols:
-        conditions += ["N/A"] * (num_condition_cols - len(conditions))
-    else:
-        conditions = conditions[:num_condition_cols]
-    """
-    # 寫入一列
-    row_values = [rules, result] + conditions
-    ws.append(row_values)
-    last_row = ws.max_row
-
-    # 給儲存格指派上色
-    rules_color = PatternFill(start_color="DAEEF3", end_color="DAEEF3", fill_type="solid")
-    failed_color = PatternFill(start_color="FDE9D9", end_color="FDE9D9", fill_type="solid")
-    # 上色
-    first_cell = ws.cell(row=last_row, column=1)  # 欄位1對應的是 'A' 列
-    first_cell.fill = rules_color
-    if result == "FAIL":
-        ws.cell(row=last_row, column=2).fill = failed_color
-    if conditions[1] != "File Exists = N/A":
-        ws.cell(row=last_row, column=4).fill = failed_color
-    if conditions[0] != "LaunchCLTVByCountry = N/A":
-        ws.cell(row=last_row, column=3).fill = failed_color
-
-    # ── 統一樣式：所有欄位同寬 & 換行 & 垂直置頂（含表頭） ──
-    total_cols = 2 + num_condition_cols
-    for col_idx in range(1, total_cols + 1):
-        col_letter = get_column_letter(col_idx)
-        ws.column_dimensions[col_letter].width = COMMON_WIDTH
+        put_row(ws, header, align_cols=0)
 
-    # 表頭樣式
-    for cell in ws[1]:
-        cell.font = BOLD
-        cell.alignment = COMMON_ALIGN
+    # 寫入一列（直接寫到下一列並取回該列儲存格，不呼叫 ws.max_row；第 1..total_cols 欄換行 & 垂直置頂）
+    cells = put_row(ws, row_values, align_cols=total_cols)
 
-    # 資料列樣式（最新一列）
-    for col_idx in range(1, total_cols + 1):
-        ws.cell(row=last_row, column=col_idx).alignment = COMMON_ALIGN
+    # 上色
+    _paint_row(cells, row_values)
 
-    # 移除預設空白 Sheet（若存在且非唯一）
-    if "Sheet" in wb.sheetnames and len(wb.sheetnames) > 1:
-        try:
-            wb.remove(wb["Sheet"])
-        except Exception:
-            pass
+    # ── 統一樣式：所有欄位同寬 & 換行 & 垂直置頂（含表頭；欄寬/表頭每個分頁只設一次） ──
+    style_sheet(ws, total_cols)
 
-    wb.save(xlsx_path)
+    # 立即存檔（同一份 xlsx 接著可能由其他檢查寫入）；預設空白 Sheet 於存檔時移除
+    if save:
+        save_workbook(xlsx_path)
 
 
 # -----------------------------
 # Core logic
 # -----------------------------
-def _read_text_lines(path: str):
-    for enc in ("utf-8", "latin-1", "utf-16"):
-        try:
-            with open(path, "r", encoding=enc, errors="ignore") as f:
-                return f.readlines()
-        except UnicodeDecodeError:
-            continue
-        except FileNotFoundError:
-            raise
-    with open(path, "r") as f:
-        return f.readlines()
-
-
 def _strip_comment(line: str) -> str:
     # 僅去掉行首 # 註解
     return line if not line.lstrip().startswith("#") else ""
@@ -177,17 +133,21 @@ def parse_model_ini_for_launch_cltv(model_ini_path: str) -> Optional[str]:
     從 model.ini 找：第一條未被 # 註解的 LaunchCLTVByCountry = "<value>"
     回傳原始 value（可含 /tvconfigs 前綴）；若未找到回傳 None。
     """
-    lines = _read_text_lines(model_ini_path)
-    for raw in lines:
-        line = _strip_comment(raw)
-        if not line:
-            continue
-        if "LaunchCLTVByCountry" in line and "=" in line:
-            m = re.search(r'LaunchCLTVByCountry\s*=\s*"([^"]*)"', line)
+    # 逐行串流讀取（檔案物件本身以區塊讀入），找到第一條宣告即停止，不必先把整份檔案讀成 list。
+    # utf-8 + errors="ignore" 一定解得開（原本之後的 latin-1 / utf-16 重試永遠不會執行到）
+    with open(model_ini_path, "r", encoding="utf-8", errors="ignore") as f:
+        for raw in f:
+            # 先用最便宜的子字串檢查過濾，含 key 的行才做註解判斷與 regex
+            if "LaunchCLTVByCountry" not in raw or "=" not in raw:
+                continue
+            line = _strip_comment(raw)
+            if not line:
+                continue
+            m = _LAUNCH_CLTV_RE.search(line)
             if m:
                 return m.group(1).strip()
             # 容忍未加引號
-            m2 = re.search(r'LaunchCLTVByCountry\s*=\s*(\S+)', line)
+            m2 = _LAUNCH_CLTV_BARE_RE.search(line)
             if m2:
                 return m2.group(1).strip()
             # 格式不正確時，回傳空字串以供後續 FAIL 判定
@@ -195,23 +155,9 @@ def parse_model_ini_for_launch_cltv(model_ini_path: str) -> Optional[str]:
     return None
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Check LaunchCLTVByCountry in model.ini and export report (tv_multi_standard_validation.py style).")
-    parser.add_argument("--root", required=True, help="專案根目錄路徑（將 /tvconfigs/* 映射到此）")
-    parser.add_argument("--model-ini", required=True, help="model.ini 檔案路徑（例如 model/1_xxx.ini）")
-    parser.add_argument("--report", action="store_true", help="輸出報表到 xlsx（預設檔名 kipling.xlsx）")
-    parser.add_argument("--report-xlsx", metavar="FILE", help="指定報表 xlsx 檔案名稱")
-    parser.add_argument("--conditions", type=int, default=5, help="condition_* 欄位數，預設 5")
-    parser.add_argument("-v", "--verbose", action="store_true", help="顯示詳細過程")
-    args = parser.parse_args()
-
-    model_ini = args.model_ini
-    if not os.path.exists(model_ini):
-        raise SystemExit(f"[ERROR] model ini not found: {model_ini}")
-
-    root = os.path.abspath(os.path.normpath(args.root))
-
-    if args.verbose:
+def _check_one(model_ini: str, root: str, verbose: bool = False) -> dict:
+    """檢查單一 model.ini（root 為已正規化的絕對路徑），印出比對步驟，回傳 export_report 用的 res"""
+    if verbose:
         print(f"[INFO] model_ini: {model_ini}")
         print(f"[INFO] root     : {root}")
 
@@ -219,14 +165,14 @@ def main():
     raw_value = parse_model_ini_for_launch_cltv(model_ini)
 
     if raw_value is None:
-        if args.verbose:
+        if verbose:
             print("[INFO] LaunchCLTVByCountry 未宣告（或只有註解）→ N/A")
         result = "PASS"
         resolved = ""
         exists_text = "N/A"
     else:
         if raw_value == "":
-            if args.verbose:
+            if verbose:
                 print("[WARN] LaunchCLTVByCountry 格式錯誤或值為空 → FAIL")
             result = "PASS"
             resolved = ""
@@ -264,13 +210,54 @@ def main():
         "model_ini": model_ini, # 用於決定分頁（PID_1..others），不會直接輸出欄位
         "conditions": conditions,
     }
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check LaunchCLTVByCountry in model.ini and export report (tv_multi_standard_validation.py style).")
+    parser.add_argument("--root", required=True, help="專案根目錄路徑（將 /tvconfigs/* 映射到此）")
+    parser.add_argument("--model-ini", help="model.ini 檔案路徑（例如 model/1_xxx.ini）")
+    parser.add_argument("--batch-list", metavar="FILE",
+                        help="列出多個 model.ini 路徑的檔案（一行一個）；同一行程內全部檢查，報表只存檔一次")
+    parser.add_argument("--report", action="store_true", help="輸出報表到 xlsx（預設檔名 kipling.xlsx）")
+    parser.add_argument("--report-xlsx", metavar="FILE", help="指定報表 xlsx 檔案名稱")
+    parser.add_argument("--conditions", type=int, default=5, help="condition_* 欄位數，預設 5")
+    parser.add_argument("-v", "--verbose", action="store_true", help="顯示詳細過程")
+    args = parser.parse_args()
+
+    model_inis = [args.model_ini] if args.model_ini else []
+    if args.batch_list:
+        model_inis += read_batch_list(args.batch_list)
+    if not model_inis:
+        parser.error("one of --model-ini / --batch-list is required")
+    batch = len(model_inis) > 1
+
+    root = os.path.abspath(os.path.normpath(args.root))
+    want_report = args.report or args.report_xlsx
+    xlsx_path = (args.report_xlsx or "kipling.xlsx") if want_report else None
+
+    missing = False
+    for model_ini in model_inis:
+        if not os.path.exists(model_ini):
+            if not batch:
+                raise SystemExit(f"[ERROR] model ini not found: {model_ini}")
+            print(f"[ERROR] model ini not found: {model_ini}", file=sys.stderr)
+            missing = True
+            continue
+
+        res = _check_one(model_ini, root, args.verbose)
+
+        # 報表輸出（批次：附加到記憶體中的 workbook，最後只存檔一次）
+        if xlsx_path:
+            export_report(res, xlsx_path=xlsx_path, num_condition_cols=args.conditions, save=not batch)
+            sheet = _sheet_name_for_model(model_ini)
+            print(f"[INFO] Report appended to: {xlsx_path} (sheet: {sheet})")
 
-    # 報表輸出
-    if args.report or args.report_xlsx:
-        xlsx_path = args.report_xlsx if args.report_xlsx else "kipling.xlsx"
-        export_report(res, xlsx_path=xlsx_path, num_condition_cols=args.conditions)
-        sheet = _sheet_name_for_model(model_ini)
-        print(f"[INFO] Report appended to: {xlsx_path} (sheet: {sheet})")
+    if xlsx_path and batch:
+        from _tvconfigs_report import save_workbook
+        save_workbook(xlsx_path)
+    if missing:
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":
@@ -4,51 +4,29 @@
 import argparse
 import os
 import re
+import sys
 from typing import Optional
 
-def _sheet_name_for_model(model_ini_path: str) -> str:
-    base = os.path.basename(model_ini_path or "")
-    m = re.match(r"^(\d+)_", base)
-    if m:
-        return f"PID_{int(m.group(1))}"
-    return "others"
-
-def _ensure_openpyxl():
-    try:
-        import openpyxl  # noqa
-    except ImportError:
-        raise SystemExit(
-            "[ERROR] 需要 openpyxl 套件以支援報表輸出\n"
-            "  安裝： pip install --user openpyxl\n"
-        )
-
-def export_report(res: dict, xlsx_path: str = "kipling.xlsx", num_condition_cols: int = 3) -> None:
-    _ensure_openpyxl()
-    from openpyxl import Workbook, load_workbook
-    from openpyxl.styles import Alignment, Font, PatternFill
-    from openpyxl.utils import get_column_letter
-
-    COMMON_WIDTH = 60
-    COMMON_ALIGN = Alignment(wrap_text=True, vertical="top")
-    BOLD = Font(bold=True)
-
-    def _na(s: str) -> str:
-        s = (s or "").strip()
-        return s if s else "N/A"
+from _tvconfigs_common import _na, _normalize_line_breaks, _read_text, _sheet_name_for_model, read_batch_list
 
-    sheet_name = _sheet_name_for_model(res.get("model_ini", ""))
+# 模組載入時編譯一次（逐行比對不再經過 re 模組的 pattern 快取查找）
+_CUST_RE = re.compile(r'^\s*CustRetailModeInten\s*=\s*(.+)$', re.IGNORECASE)
+# 只找 key 本身（大小寫規則同 _CUST_RE），用來跳過不含 key 的行
+_CUST_KEY_RE = re.compile(r'CustRetailModeInten', re.IGNORECASE)
 
-    try:
-        wb = load_workbook(xlsx_path)
-    except Exception:
-        wb = Workbook()
+# 本檢查報表的欄寬（其他檢查用 _tvconfigs_report.COMMON_WIDTH = 80）
+_REPORT_WIDTH = 60
 
-    if sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-    else:
-        ws = wb.create_sheet(title=sheet_name)
-        headers = ["Rules", "Result"] + [f"condition_{i}" for i in range(1, num_condition_cols + 1)]
-        ws.append(headers)
+def export_report(res: dict, xlsx_path: str = "kipling.xlsx", num_condition_cols: int = 3, save: bool = True) -> None:
+    """
+    save=False：只附加到 _tvconfigs_report.get_workbook 快取的 workbook，由呼叫端最後 save_workbook(xlsx_path) 一次存檔
+    """
+    # 共用報表模組（openpyxl 缺少時由它提示安裝方式）；樣式物件為模組層級共用，不每次呼叫重建
+    from _tvconfigs_report import (
+        get_workbook, put_row, report_exists, save_workbook, style_sheet, write_report_batch,
+    )
+
+    sheet_name = _sheet_name_for_model(res.get("model_ini", ""))
 
     rules = "CustRetailModeInten defined?"
     result = "PASS" if res.get("passed", False) else "FAIL"
@@ -59,40 +37,33 @@ def export_report(res: dict, xlsx_path: str = "kipling.xlsx", num_condition_cols
     ][:num_condition_cols]
 
     row_values = [rules, result] + conds
-    ws.append(row_values)
-    last_row = ws.max_row
-
     total_cols = 2 + num_condition_cols
-    for col_idx in range(1, total_cols + 1):
-        col_letter = get_column_letter(col_idx)
-        ws.column_dimensions[col_letter].width = COMMON_WIDTH
-
-    for cell in ws[1]:
-        cell.font = BOLD
-        cell.alignment = COMMON_ALIGN
-
-    for cell in ws[last_row]:
-        cell.alignment = COMMON_ALIGN
-
-    if "Sheet" in wb.sheetnames and len(wb.sheetnames) > 1:
-        try:
-            wb.remove(wb["Sheet"])
-        except Exception:
-            pass
-
-    wb.save(xlsx_path)
-
-def _read_text(path: str) -> str:
-    for enc in ("utf-8", "latin-1", "utf-16"):
-        try:
-            with open(path, "r", encoding=enc) as f:
-                return f.read()
-        except UnicodeDecodeError:
-            continue
-        except FileNotFoundError:
-            raise
-    with open(path, "r") as f:
-        return f.read()
+
+    # 報表還不存在：write-only 串流寫出（表頭 + 這一列），欄寬/表頭粗體/換行置頂同就地附加
+    if save and not report_exists(xlsx_path):
+        write_report_batch({sheet_name: [row_values]}, xlsx_path, num_condition_cols,
+                           width=_REPORT_WIDTH, align_cols=total_cols)
+        return
+
+    # 本行程已載入過的 workbook 直接沿用，不再每次 load_workbook
+    wb = get_workbook(xlsx_path)
+
+    if sheet_name in wb.sheetnames:
+        ws = wb[sheet_name]
+    else:
+        ws = wb.create_sheet(title=sheet_name)
+        headers = ["Rules", "Result"] + [f"condition_{i}" for i in range(1, num_condition_cols + 1)]
+        put_row(ws, headers, align_cols=0)
+
+    # 直接寫到下一列（不呼叫 ws.max_row）；換行置頂對齊到分頁最大欄數，同原本 `for cell in ws[last_row]`
+    put_row(ws, row_values)
+
+    # 欄寬/表頭樣式每個分頁只設一次
+    style_sheet(ws, total_cols, width=_REPORT_WIDTH)
+
+    # 立即存檔（同一份 xlsx 接著可能由其他檢查寫入）；預設空白 Sheet 於存檔時移除
+    if save:
+        save_workbook(xlsx_path)
 
 def _strip_comment(line: str) -> str:
     line = line.split("#", 1)[0]
@@ -100,43 +71,79 @@ def _strip_comment(line: str) -> str:
     return line.strip()
 
 def parse_model_ini_for_cust(model_ini_path: str) -> Optional[str]:
-    txt = _read_text(model_ini_path)
-    for raw in txt.splitlines():
-        line = _strip_comment(raw)
-        if not line:
+    # 換行統一成 '\n'（切行同 splitlines），再於整份文字上找 key 出現的位置（C 層掃描），
+    # 只對含 key 的那幾行去註解 + 比對；依行序處理，第一個符合的行即回傳（結果同逐行掃描）
+    txt = _normalize_line_breaks(_read_text(model_ini_path))
+    done = 0
+    for hit in _CUST_KEY_RE.finditer(txt):
+        pos = hit.start()
+        if pos < done:  # 同一行內再次出現
             continue
-        m = re.match(r'^\s*CustRetailModeInten\s*=\s*(.+)$', line, re.IGNORECASE)
+        start = txt.rfind("\n", 0, pos) + 1
+        end = txt.find("\n", pos)
+        if end < 0:
+            end = len(txt)
+        done = end
+        m = _CUST_RE.match(_strip_comment(txt[start:end]))
         if m:
             return m.group(1).strip()
     return None
 
-def main():
-    parser = argparse.ArgumentParser(description="Check CustRetailModeInten in model.ini")
-    parser.add_argument("--model-ini", required=True, help="Path to model.ini")
-    parser.add_argument("--root", default=".", help="Root dir for tvconfigs (not used here)")
-    parser.add_argument("--report", default="kipling.xlsx", help="xlsx report path")
-    parser.add_argument("-v", "--verbose", action="store_true")
-    args = parser.parse_args()
-
-    cust_val = parse_model_ini_for_cust(args.model_ini)
+def _check_one(model_ini: str, verbose: bool = False) -> dict:
+    cust_val = parse_model_ini_for_cust(model_ini)
     passed = cust_val is not None
 
     res = {
-        "model_ini": args.model_ini,
+        "model_ini": model_ini,
         "passed": passed,
         "cust_val": cust_val,
     }
 
-    if args.verbose:
+    if verbose:
         if passed:
             print(f"[INFO] Found CustRetailModeInten = {cust_val}")
         else:
             print("[INFO] CustRetailModeInten not defined")
+    return res
+
+def main():
+    parser = argparse.ArgumentParser(description="Check CustRetailModeInten in model.ini")
+    parser.add_argument("--model-ini", help="Path to model.ini")
+    parser.add_argument("--batch-list", metavar="FILE",
+                        help="File listing model.ini paths (one per line); all are checked in one run and the report is saved once")
+    parser.add_argument("--root", default=".", help="Root dir for tvconfigs (not used here)")
+    parser.add_argument("--report", default="kipling.xlsx", help="xlsx report path")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    model_inis = [args.model_ini] if args.model_ini else []
+    if args.batch_list:
+        model_inis += read_batch_list(args.batch_list)
+    if not model_inis:
+        parser.error("one of --model-ini / --batch-list is required")
+    batch = len(model_inis) > 1
+
+    missing = False
+    for model_ini in model_inis:
+        # 批次中找不到的 model.ini 只記錄並跳過，其餘照常檢查
+        if batch and not os.path.exists(model_ini):
+            print(f"[ERROR] model ini not found: {model_ini}", file=sys.stderr)
+            missing = True
+            continue
+
+        res = _check_one(model_ini, args.verbose)
+
+        # 批次：附加到記憶體中的 workbook，最後只存檔一次
+        if args.report:
+            export_report(res, args.report, save=not batch)
 
-    if args.report:
-        export_report(res, args.report)
+        print("Result :", "PASS" if res["passed"] else "FAIL")
 
-    print("Result :", "PASS" if passed else "FAIL")
+    if args.report and batch:
+        from _tvconfigs_report import save_workbook
+        save_workbook(args.report)
+    if missing:
+        raise SystemExit(1)
 
 if __name__ == "__main__":
     main()